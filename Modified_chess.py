@@ -1,8 +1,208 @@
+import random
+import re
+
+from events import MoveMade, PieceCaptured, GameEnded
+
+
 class ImplementInSubClass(Exception):
     """To override parent class ChessPiece"""
     pass
 
 
+# Squares are numbered 0 to 63 starting from a1, so square // 8 is the row and
+# square % 8 is the column. ChessVar._chess_board is indexed by square and
+# algebraic notation is only used at the edges, in make_move and printing.
+SQUARE_NAMES = tuple('abcdefgh'[column] + str(row + 1) for row in range(8) for column in range(8))
+SQUARE_INDEX = {name: square for square, name in enumerate(SQUARE_NAMES)}
+
+# Pieces of the printed board
+BOARD_FILES = "     a   b   c   d   e   f   g   h"
+BOARD_BORDER = " +-----------------------------------+"
+EMPTY_CELL = '..'
+
+
+def jump_table(offsets):
+    """
+    Builds, for every square, the squares reachable with a single jump
+    by one of the (row, column) offsets
+    """
+    table = []
+    for square in range(64):
+        row, column = divmod(square, 8)
+        targets = []
+        for row_step, column_step in offsets:
+            if 0 <= row + row_step < 8 and 0 <= column + column_step < 8:
+                targets.append(square + row_step * 8 + column_step)
+        table.append(tuple(targets))
+    return tuple(table)
+
+
+def ray_table(directions):
+    """
+    Builds, for every square, one ray per direction listing the squares a
+    sliding piece passes over in order, nearest square first
+    """
+    table = []
+    for square in range(64):
+        row, column = divmod(square, 8)
+        rays = []
+        for row_step, column_step in directions:
+            ray = []
+            new_row, new_column = row + row_step, column + column_step
+            while 0 <= new_row < 8 and 0 <= new_column < 8:
+                ray.append(new_row * 8 + new_column)
+                new_row, new_column = new_row + row_step, new_column + column_step
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+def parse_move(text):
+    """Turns move text such as 'g1f3' or 'g1-f3' into a ('g1', 'f3') pair"""
+    text = text.replace('-', '')
+    if len(text) != 4 or text[:2] not in SQUARE_INDEX or text[2:] not in SQUARE_INDEX:
+        raise ValueError('not a move: ' + text)
+    return text[:2], text[2:]
+
+
+# Move tables built once at import, used by the move generator
+STRAIGHT_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+KNIGHT_MOVES = jump_table(((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_MOVES = jump_table(STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS)
+ROOK_RAYS = ray_table(STRAIGHT_DIRECTIONS)
+BISHOP_RAYS = ray_table(DIAGONAL_DIRECTIONS)
+QUEEN_RAYS = ray_table(STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS)
+SLIDING_RAYS = {'Bishop': BISHOP_RAYS, 'Rook': ROOK_RAYS, 'Queen': QUEEN_RAYS}
+
+# Diagonal capture squares for pawns, white pawns move up the rows and black down
+PAWN_CAPTURES = {'WHITE': jump_table(((1, 1), (1, -1))), 'BLACK': jump_table(((-1, 1), (-1, -1)))}
+
+# Number of pieces of each type a side starts with. Losing all of any one type
+# loses the game, and queens and kings only come one to a side.
+PIECE_TOTALS = {'Pawn': 8, 'Knight': 2, 'Bishop': 2, 'Rook': 2, 'Queen': 1, 'King': 1}
+
+# Types a side starts with more than one of, queens and kings are always one capture from losing
+MULTIPLE_TYPES = tuple(piece_type for piece_type, total in PIECE_TOTALS.items() if total > 1)
+
+# Letters used by the text position format, white in upper case and black in lower
+PIECE_LETTERS = {'Pawn': 'P', 'Knight': 'N', 'Bishop': 'B', 'Rook': 'R', 'Queen': 'Q', 'King': 'K'}
+LETTER_PIECES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
+# Game state markers for the text format and codes for the binary format
+STATE_RESULTS = {'UNFINISHED': '*', 'WHITE_WON': '1-0', 'BLACK_WON': '0-1', 'DRAW': '1/2-1/2'}
+RESULT_STATES = {result: state for state, result in STATE_RESULTS.items()}
+STATE_CODES = {'UNFINISHED': 0, 'WHITE_WON': 1, 'BLACK_WON': 2, 'DRAW': 3}
+CODE_STATES = {code: state for state, code in STATE_CODES.items()}
+
+# Default draw rules: a position seen this many times, or this many plies in a
+# row without a capture, draws the game
+REPETITION_LIMIT = 3
+NO_CAPTURE_LIMIT = 100
+
+# Binary positions are one header byte, a nibble per square and a nibble per
+# captured count. Piece nibbles are 1 to 6 in PIECE_LETTERS order, plus 8 for black.
+POSITION_BYTES = 1 + 32 + 6
+
+# Zobrist keys, drawn from a fixed seed so every process hashes positions alike.
+# Captured counts are part of the position since they decide the win, a count
+# of zero hashes to 0 so untouched piece types leave the key alone.
+_zobrist_random = random.Random(20240229)
+ZOBRIST_PIECES = {color: {piece_type: tuple(_zobrist_random.getrandbits(64) for _ in range(64))
+                          for piece_type in ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')}
+                  for color in ('WHITE', 'BLACK')}
+ZOBRIST_CAPTURED = {color: {piece_type: (0,) + tuple(_zobrist_random.getrandbits(64) for _ in range(8))
+                            for piece_type in ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')}
+                    for color in ('WHITE', 'BLACK')}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+
+class AttackMap:
+    """
+    Attack maps of a board: the squares each piece attacks and, for every
+    square, the pieces attacking it and how many of each color. A piece
+    attacks the squares it could capture on, so pawns attack diagonally
+    forward and sliding pieces up to and including the first occupied square
+    of each ray. ChessVar builds one on first use and keeps it up to date
+    through _set_square.
+    """
+
+    __slots__ = ('_board', '_attacks', '_attackers', '_counts')
+
+    def __init__(self, board):
+        """Builds the maps for board, a list of 64 squares"""
+        self._board = board
+        self._attacks = [()] * 64  # square -> squares its piece attacks
+        self._attackers = [set() for _ in range(64)]  # square -> squares attacking it
+        self._counts = {'WHITE': [0] * 64, 'BLACK': [0] * 64}  # attackers per color and square
+        for square, piece in enumerate(board):
+            if piece is not None:
+                self._add(square, piece)
+
+    def _targets(self, square, piece):
+        """Returns the squares the piece on square attacks"""
+        piece_type = piece._piece_type
+        if piece_type == 'Pawn':
+            return PAWN_CAPTURES[piece._color][square]
+        if piece_type == 'Knight':
+            return KNIGHT_MOVES[square]
+        if piece_type == 'King':
+            return KING_MOVES[square]
+
+        board = self._board
+        targets = []
+        for ray in SLIDING_RAYS[piece_type][square]:
+            for target in ray:
+                targets.append(target)
+                if board[target] is not None:
+                    break  # Path is blocked
+        return targets
+
+    def _add(self, square, piece):
+        """Counts the attacks of the piece on square"""
+        targets = self._targets(square, piece)
+        self._attacks[square] = targets
+        counts = self._counts[piece._color]
+        for target in targets:
+            self._attackers[target].add(square)
+            counts[target] += 1
+
+    def _remove(self, square, piece):
+        """Takes back the attacks counted for the piece on square"""
+        counts = self._counts[piece._color]
+        for target in self._attacks[square]:
+            self._attackers[target].discard(square)
+            counts[target] -= 1
+        self._attacks[square] = ()
+
+    def update(self, square, previous, piece):
+        """Follows the board after square changed from previous to piece"""
+        if previous is not None:
+            self._remove(square, previous)
+
+        # Sliding pieces reaching square now stop there, or now pass through it
+        if (previous is None) != (piece is None):
+            board = self._board
+            for attacker in [attacker for attacker in self._attackers[square]
+                             if board[attacker]._piece_type in SLIDING_RAYS]:
+                slider = board[attacker]
+                self._remove(attacker, slider)
+                self._add(attacker, slider)
+
+        if piece is not None:
+            self._add(square, piece)
+
+    def attackers(self, square):
+        """Returns the set of squares whose pieces attack square"""
+        return self._attackers[square]
+
+    def count(self, square, color):
+        """Returns how many of color's pieces attack square"""
+        return self._counts[color][square]
+
+
 class ChessVar:
     """
     ChessVar's main responsibility is to keep track of the current
@@ -13,16 +213,113 @@ class ChessVar:
     condition class in order to receive information of the state of the game.
     """
 
-    def __init__(self):
+    def __init__(self, repetition_limit=REPETITION_LIMIT, no_capture_limit=NO_CAPTURE_LIMIT):
         """
         Initialize data members such as state of game and player turn,
-        white captured pieces and black captured pieces
+        white captured pieces and black captured pieces.
+
+        The game is drawn when a position comes up repetition_limit times or
+        no_capture_limit plies pass without a capture. None turns a rule off.
         """
 
-        self._get_game_state = 'UNFINISHED'  # UNFINISHED, WHITE_WON, BLACK_WON
+        self._get_game_state = 'UNFINISHED'  # UNFINISHED, WHITE_WON, BLACK_WON, DRAW
         self._game_turn = 'WHITE'  # White is always the starting player
         self._chess_board = self.starting_board_layout()
         self._captured_counts = {'WHITE': {}, 'BLACK': {}}  # Tracks captured pieces
+        self._remaining = {'WHITE': dict(PIECE_TOTALS), 'BLACK': dict(PIECE_TOTALS)}  # Pieces left per type
+        self._move_stack = []  # Undo records for the moves played since the last fork
+        self._history = None  # Undo records shared with forks, see fork
+        self._zobrist_key = self.compute_zobrist_key()
+        self._attack_map = None  # AttackMap, built by the first attack query
+        self._board_shared = False  # Board list shared with a fork, copied before the next write
+        self._material_shared = False  # Same for the captured counts and remaining pieces
+        self._repetition_limit = repetition_limit
+        self._no_capture_limit = no_capture_limit
+        self._position_counts = {self._zobrist_key: 1}  # Zobrist key -> times the position came up
+        self._shared_counts = None  # Position counts shared with forks, see fork
+        self._plies_since_capture = 0
+        self._subscribers = []  # Callables given every event of make_move
+
+    def fork(self):
+        """
+        Returns a new game branching off from the current position. The child
+        shares the board and material counts with this game, and whichever of
+        the two changes them first takes its own copy. The undo records and
+        position counts are frozen and shared, each game keeping its changes
+        on top, so a fork costs the same however long the game is. The child
+        can take back moves from before the fork with pop.
+        """
+        self._share_history()
+        self._share_position_counts()
+
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child._move_stack = []
+        child._position_counts = {}
+        child._attack_map = None
+        child._subscribers = []
+
+        self._board_shared = self._material_shared = True
+        child._board_shared = child._material_shared = True
+        return child
+
+    def _share_history(self):
+        """
+        Freezes the undo records played since the last fork into a history
+        node (records, count, below, plies): records[:count] are its moves,
+        below is the node before it and plies counts the moves of both.
+        """
+        records = self._move_stack
+        if records:
+            below = self._history
+            plies = len(records) + (below[3] if below is not None else 0)
+            self._history = (records, len(records), below, plies)
+            self._move_stack = []
+
+    def _share_position_counts(self):
+        """
+        Freezes the position counts changed since the last fork into a layer
+        (counts, below), whose counts hide those of the layers below. Layers
+        no more than twice the size of the new one are merged into it, so
+        there are only ever a few layers to look through.
+        """
+        counts = self._position_counts
+        if not counts:
+            return
+        below = self._shared_counts
+        merged = False
+        while below is not None and len(below[0]) <= 2 * len(counts):
+            counts = {**below[0], **counts}
+            below = below[1]
+            merged = True
+        if merged and below is None:
+            counts = {key: count for key, count in counts.items() if count}  # Zeros only hide lower layers
+        self._shared_counts = (counts, below)
+        self._position_counts = {}
+
+    def _shared_position_count(self, key):
+        """Returns how many times the position with key came up according to the shared layers"""
+        layer = self._shared_counts
+        while layer is not None:
+            count = layer[0].get(key)
+            if count is not None:
+                return count
+            layer = layer[1]
+        return 0
+
+    def _pop_history(self):
+        """Takes the last undo record off the history shared with forks"""
+        if self._history is None:
+            raise IndexError('no moves to take back')
+        records, count, below, plies = self._history
+        self._history = (records, count - 1, below, plies - 1) if count > 1 else below
+        return records[count - 1]
+
+    def _unshare_material(self):
+        """Takes private copies of the material counts shared with a fork before changing them"""
+        self._captured_counts = {color: dict(counts) for color, counts in self._captured_counts.items()}
+        self._remaining = {color: dict(remaining) for color, remaining in self._remaining.items()}
+        self._material_shared = False
 
     def get_game_turn(self):
         """Returns game turn"""
@@ -32,133 +329,532 @@ class ChessVar:
     def set_game_turn(self, players_turn):
         """sets item location"""
 
+        if players_turn != self._game_turn:
+            self._zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
         self._game_turn = players_turn
 
+    def get_zobrist_key(self):
+        """Returns the 64-bit Zobrist key of the current position"""
+
+        return self._zobrist_key
+
+    def compute_zobrist_key(self):
+        """
+        Computes the Zobrist key of the current position from scratch, covering
+        piece placement, the side to move and the captured counts
+        """
+        key = 0
+        for square, piece in enumerate(self._chess_board):
+            if piece is not None:
+                key ^= ZOBRIST_PIECES[piece._color][piece._piece_type][square]
+
+        if self._game_turn == 'BLACK':
+            key ^= ZOBRIST_BLACK_TO_MOVE
+
+        for color, captured in self._captured_counts.items():
+            for piece_type, count in captured.items():
+                key ^= ZOBRIST_CAPTURED[color][piece_type][count]
+
+        return key
+
     def set_game_state(self, game_condition):
         """sets state of game"""
         
-        # UNFINISHED, WHITE_WON, BLACK_WON
+        # UNFINISHED, WHITE_WON, BLACK_WON, DRAW
         self._get_game_state = game_condition
 
 
     def starting_board_layout(self):
         """Starting board layout for modified chess game"""
 
-        # Creating an 8 by 8 layout to set initial layout
-        chessboard = [[None for _ in range(8)] for _ in range(8)]
+        # One entry per square from a1 to h8, holding the shared piece objects
+        chessboard = [None] * 64
+        back_row = ('Rook', 'Knight', 'Bishop', 'Queen', 'King', 'Bishop', 'Knight', 'Rook')
 
         # Initial positioning for each chess piece
-        # Place white pieces
-        chessboard[0][0] = Rook('WHITE', 'a1')
-        chessboard[0][1] = Knight('WHITE', 'b1')
-        chessboard[0][2] = Bishop('WHITE', 'c1')
-        chessboard[0][3] = Queen('WHITE', 'd1')
-        chessboard[0][4] = King('WHITE', 'e1')
-        chessboard[0][5] = Bishop('WHITE', 'f1')
-        chessboard[0][6] = Knight('WHITE', 'g1')
-        chessboard[0][7] = Rook('WHITE', 'h1')
+        for column, piece_type in enumerate(back_row):
+            chessboard[column] = PIECES['WHITE'][piece_type]
+            chessboard[56 + column] = PIECES['BLACK'][piece_type]
 
         # Arranges pawn
-        for i in range(8):
-            chessboard[1][i] = Pawn('WHITE', chr(97 + i) + '2')
-
-        # Place black pieces
-        chessboard[7][0] = Rook('BLACK', 'a8')
-        chessboard[7][1] = Knight('BLACK', 'b8')
-        chessboard[7][2] = Bishop('BLACK', 'c8')
-        chessboard[7][3] = Queen('BLACK', 'd8')
-        chessboard[7][4] = King('BLACK', 'e8')
-        chessboard[7][5] = Bishop('BLACK', 'f8')
-        chessboard[7][6] = Knight('BLACK', 'g8')
-        chessboard[7][7] = Rook('BLACK', 'h8')
-
-        # Arranges pawn
-        for i in range(8):
-            chessboard[6][i] = Pawn('BLACK', chr(97 + i) + '7')
+        for column in range(8):
+            chessboard[8 + column] = PIECES['WHITE']['Pawn']
+            chessboard[48 + column] = PIECES['BLACK']['Pawn']
 
         return chessboard
 
-    def print_chessboard(self):
-        """Prints the current state of the chess board."""
-        print(  "     a   b   c   d   e   f   g   h")
-        print(" +-----------------------------------+")
-        for i in range(8):
-            # label rows by number
-            print(str(i + 1) + ' |', end=' ')
-            for j in range(8):
-                piece = self._chess_board[i][j]
+    def to_text(self):
+        """
+        Returns the position as one line of text: the board from the 8th row
+        down as in FEN, the side to move, the captured pieces and the result,
+        such as 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - *'. Captured
+        pieces are a letter per type in PIECE_LETTERS order followed by the count
+        when above one, upper case for white's losses and lower case for black's,
+        or '-' for none.
+        """
+        rows = []
+        for row_start in range(56, -8, -8):
+            row = self._chess_board[row_start:row_start + 8]
+            text = ''
+            empty = 0
+            for piece in row:
                 if piece is None:
-                    print('..', end='  ')  # Print two dots for empty squares
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[piece._piece_type]
+                text += letter if piece._color == 'WHITE' else letter.lower()
+            rows.append(text + str(empty) if empty else text)
+
+        captured = ''
+        for color in ('WHITE', 'BLACK'):
+            for piece_type in PIECE_LETTERS:
+                count = self._captured_counts[color].get(piece_type, 0)
+                if count:
+                    letter = PIECE_LETTERS[piece_type]
+                    captured += (letter if color == 'WHITE' else letter.lower()) + (str(count) if count > 1 else '')
+
+        turn = 'w' if self._game_turn == 'WHITE' else 'b'
+        return ' '.join(('/'.join(rows), turn, captured or '-', STATE_RESULTS[self._get_game_state]))
+
+    @classmethod
+    def from_text(cls, text):
+        """Creates a game at the position written by to_text"""
+        fields = text.split()
+        if len(fields) != 4:
+            raise ValueError('position text needs 4 fields: ' + text)
+        board_text, turn, captured_text, result = fields
+
+        rows = board_text.split('/')
+        if len(rows) != 8:
+            raise ValueError('position text needs 8 rows: ' + board_text)
+
+        pieces = []
+        for row in reversed(rows):
+            row_pieces = []
+            for character in row:
+                if character.isdigit():
+                    row_pieces.extend([None] * int(character))
+                elif character.upper() in LETTER_PIECES:
+                    color = 'WHITE' if character.isupper() else 'BLACK'
+                    row_pieces.append((color, LETTER_PIECES[character.upper()]))
                 else:
-                    print(piece.get_icon(), end='  ')  # Print the piece's icon with spacing
-            print('| ' + str(i + 1))
-        print(" +-----------------------------------+")
-        print(  "     a   b   c   d   e   f   g   h")
+                    raise ValueError('unknown piece letter: ' + character)
+            if len(row_pieces) != 8:
+                raise ValueError('position row does not have 8 squares: ' + row)
+            pieces.extend(row_pieces)
+
+        if turn not in ('w', 'b'):
+            raise ValueError('side to move must be w or b: ' + turn)
+        if result not in RESULT_STATES:
+            raise ValueError('unknown result: ' + result)
+
+        captured_counts = {'WHITE': {}, 'BLACK': {}}
+        if captured_text != '-':
+            matches = re.findall(r'([PNBRQKpnbrqk])(\d*)', captured_text)
+            if ''.join(letter + count for letter, count in matches) != captured_text:
+                raise ValueError('unreadable captured pieces: ' + captured_text)
+            for letter, count in matches:
+                color = 'WHITE' if letter.isupper() else 'BLACK'
+                captured_counts[color][LETTER_PIECES[letter.upper()]] = int(count or 1)
+
+        game = cls()
+        game._load_position(pieces, 'WHITE' if turn == 'w' else 'BLACK', RESULT_STATES[result], captured_counts)
+        return game
+
+    def to_bytes(self):
+        """
+        Returns the position packed into POSITION_BYTES bytes: a header byte with
+        the side to move and the game state, a nibble per square from a1 to h8,
+        then a nibble per captured count for white then black in PIECE_LETTERS order
+        """
+        data = bytearray(POSITION_BYTES)
+        data[0] = (self._game_turn == 'BLACK') | STATE_CODES[self._get_game_state] << 1
+
+        codes = {piece_type: code for code, piece_type in enumerate(PIECE_LETTERS, 1)}
+        for square in range(64):
+            piece = self._chess_board[square]
+            if piece is not None:
+                code = codes[piece._piece_type] | (8 if piece._color == 'BLACK' else 0)
+                data[1 + (square >> 1)] |= code << 4 * (square & 1)
+
+        nibble = 0
+        for color in ('WHITE', 'BLACK'):
+            for piece_type in PIECE_LETTERS:
+                data[33 + (nibble >> 1)] |= self._captured_counts[color].get(piece_type, 0) << 4 * (nibble & 1)
+                nibble += 1
+
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Creates a game at the position packed by to_bytes"""
+        if len(data) != POSITION_BYTES:
+            raise ValueError(f'packed positions are {POSITION_BYTES} bytes, got {len(data)}')
+        if data[0] >> 1 not in CODE_STATES:
+            raise ValueError('unknown game state in packed position')
+
+        piece_types = (None,) + tuple(PIECE_LETTERS)
+        pieces = []
+        for square in range(64):
+            code = data[1 + (square >> 1)] >> 4 * (square & 1) & 15
+            if code & 7 == 0:
+                pieces.append(None)
+            elif code & 7 < len(piece_types):
+                pieces.append(('BLACK' if code & 8 else 'WHITE', piece_types[code & 7]))
+            else:
+                raise ValueError('unknown piece code in packed position')
+
+        captured_counts = {'WHITE': {}, 'BLACK': {}}
+        nibble = 0
+        for color in ('WHITE', 'BLACK'):
+            for piece_type in PIECE_LETTERS:
+                count = data[33 + (nibble >> 1)] >> 4 * (nibble & 1) & 15
+                if count:
+                    captured_counts[color][piece_type] = count
+                nibble += 1
+
+        game = cls()
+        game._load_position(pieces, 'BLACK' if data[0] & 1 else 'WHITE', CODE_STATES[data[0] >> 1], captured_counts)
+        return game
+
+    def _load_position(self, pieces, game_turn, game_state, captured_counts):
+        """
+        Replaces the current position. pieces lists a (color, piece_type) pair
+        or None for every square from a1 to h8.
+        """
+        remaining = {'WHITE': dict(PIECE_TOTALS), 'BLACK': dict(PIECE_TOTALS)}
+        for color, captured in captured_counts.items():
+            for piece_type, count in captured.items():
+                if not 0 < count <= PIECE_TOTALS[piece_type]:
+                    raise ValueError(f'impossible captured count {count} for {color} {piece_type}')
+                remaining[color][piece_type] -= count
+
+        lost = [color for color in remaining if min(remaining[color].values()) == 0]
+        if game_state == 'UNFINISHED' and lost:
+            raise ValueError(lost[0] + ' has lost every piece of a type but the game is unfinished')
+
+        for square, piece in enumerate(pieces):
+            if piece is not None:
+                color, piece_type = piece
+                piece = PIECES[color][piece_type]
+            self._set_square(square, piece)
+
+        self._game_turn = game_turn
+        self._get_game_state = game_state
+        self._captured_counts = captured_counts
+        self._remaining = remaining
+        self._material_shared = False
+        self._move_stack = []
+        self._history = None
+        self._zobrist_key = self.compute_zobrist_key()
+        self._position_counts = {self._zobrist_key: 1}
+        self._shared_counts = None
+        self._plies_since_capture = 0
+
+    def render(self):
+        """Returns the chess board as the text print_chessboard prints, in one string."""
+        board = self._chess_board
+        lines = [BOARD_FILES, BOARD_BORDER]
+        for i in range(8):
+            # label rows by number, two dots for empty squares
+            cells = ''.join((EMPTY_CELL if piece is None else piece.get_icon()) + '  '
+                            for piece in board[i * 8:i * 8 + 8])
+            lines.append(f'{i + 1} | {cells}| {i + 1}')
+        lines.append(BOARD_BORDER)
+        lines.append(BOARD_FILES)
+        return '\n'.join(lines)
+
+    def print_chessboard(self, file=None):
+        """Prints the current state of the chess board, to stdout unless file is given."""
+        print(self.render(), file=file)
 
 
     def make_move(self, move_from, move_to):
         if not self.is_game_ongoing():
             return False
 
-        if not self.is_valid_move(move_from, move_to):
+        from_square = self.move_conversion(move_from)
+        to_square = self.move_conversion(move_to)
+        if not self._is_valid_move(from_square, to_square):
             return False
 
-        self.execute_move(move_from, move_to)
-        self.switch_turn()
+        if self._subscribers:
+            self._push_and_notify(from_square, to_square)
+        else:
+            self._push(from_square, to_square)
         return True
 
+    def subscribe(self, subscriber):
+        """
+        Registers subscriber, a callable, to be called with a MoveMade,
+        PieceCaptured and GameEnded event (see events.py) for each change
+        make_move makes, and returns it. Games without subscribers pay nothing.
+        """
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Stops sending events to subscriber"""
+        self._subscribers.remove(subscriber)
+
+    def _push_and_notify(self, from_square, to_square):
+        """Plays the move like _push and sends its events to every subscriber"""
+        piece = self._chess_board[from_square]
+        captured_piece = self._chess_board[to_square]
+        self._push(from_square, to_square)
+
+        ply = self.plies_played()
+        events = [MoveMade(self, SQUARE_NAMES[from_square], SQUARE_NAMES[to_square],
+                           piece._color, piece._piece_type, ply)]
+        if captured_piece is not None:
+            captured_counts = {color: dict(counts) for color, counts in self._captured_counts.items()}
+            events.append(PieceCaptured(self, SQUARE_NAMES[to_square], captured_piece._color,
+                                        captured_piece._piece_type, captured_counts, ply))
+        if not self.is_game_ongoing():
+            events.append(GameEnded(self, self._get_game_state, ply))
+
+        # A copy, so subscribers can unsubscribe while being called
+        for subscriber in list(self._subscribers):
+            for event in events:
+                subscriber(event)
+
+    def push(self, move):
+        """
+        Plays move, a (move_from, move_to) pair such as one generated by
+        legal_moves, so that it can be taken back with pop. The move is not
+        validated, use make_move for moves that may be illegal.
+        """
+        move_from, move_to = move
+        self._push(SQUARE_INDEX[move_from], SQUARE_INDEX[move_to])
+
+    def pop(self):
+        """
+        Takes back the last move played and returns it as a (move_from, move_to)
+        pair. Restores the captured piece, captured counts, game state and turn.
+        """
+        (from_square, to_square, captured_piece, previous_count, game_state, game_turn, zobrist_key,
+         plies_since_capture, pushed_key) = self._move_stack.pop() if self._move_stack else self._pop_history()
+
+        counts = self._position_counts
+        count = counts.get(pushed_key)
+        if count is None:
+            count = self._shared_position_count(pushed_key)
+        if count > 1 or self._shared_counts is not None:
+            counts[pushed_key] = count - 1  # A zero still hides the count in the shared layers
+        elif count:
+            del counts[pushed_key]
+
+        self._set_square(from_square, self._chess_board[to_square])
+        self._set_square(to_square, captured_piece)
+
+        if captured_piece is not None:
+            if self._material_shared:
+                self._unshare_material()
+            color = captured_piece._color
+            counts = self._captured_counts[color]
+            if previous_count is None:
+                del counts[captured_piece._piece_type]
+            else:
+                counts[captured_piece._piece_type] = previous_count
+
+            self._remaining[color][captured_piece._piece_type] += 1
+
+        self._get_game_state = game_state
+        self._game_turn = game_turn
+        self._zobrist_key = zobrist_key
+        self._plies_since_capture = plies_since_capture
+        return SQUARE_NAMES[from_square], SQUARE_NAMES[to_square]
+
+    def _push(self, from_square, to_square):
+        """Plays the move between square indices and records its undo information"""
+        captured_piece = self._chess_board[to_square]
+        previous_count = None
+        if captured_piece is not None:
+            previous_count = self._captured_counts[captured_piece._color].get(captured_piece._piece_type)
+
+        game_state, game_turn, zobrist_key = self._get_game_state, self._game_turn, self._zobrist_key
+        plies_since_capture = self._plies_since_capture
+        self.execute_move(from_square, to_square)
+        self.switch_turn()
+
+        # The new key is kept too, pop uncounts it even if set_game_turn changed the key since
+        pushed_key = self._zobrist_key
+        self._move_stack.append((from_square, to_square, captured_piece, previous_count, game_state, game_turn,
+                                 zobrist_key, plies_since_capture, pushed_key))
+
+        self._plies_since_capture = 0 if captured_piece is not None else plies_since_capture + 1
+        counts = self._position_counts
+        count = counts.get(pushed_key)
+        if count is None:
+            count = self._shared_position_count(pushed_key) if self._shared_counts is not None else 0
+        count += 1
+        counts[pushed_key] = count
+        if self._get_game_state == 'UNFINISHED':
+            if ((self._repetition_limit is not None and count >= self._repetition_limit) or
+                    (self._no_capture_limit is not None and self._plies_since_capture >= self._no_capture_limit)):
+                self.set_game_state('DRAW')
+
+    def legal_moves(self, color=None):
+        """
+        Generates every legal (move_from, move_to) pair in algebraic notation
+        for color, which defaults to the player whose turn it is. Nothing is
+        generated once the game is finished.
+        """
+        if color is None:
+            color = self._game_turn
+
+        if not self.is_game_ongoing():
+            return
+
+        for move_from, move_to in self._generate_moves(color):
+            yield SQUARE_NAMES[move_from], SQUARE_NAMES[move_to]
+
+    def moves_from(self, square):
+        """
+        Generates the squares, in algebraic notation, that the piece standing
+        on square can move to. Empty squares have no moves.
+        """
+        for move_to in self._piece_moves(SQUARE_INDEX[square]):
+            yield SQUARE_NAMES[move_to]
+
+    def _generate_moves(self, color):
+        """Generates (from_square, to_square) index pairs for every piece of color"""
+        for square, piece in enumerate(self._chess_board):
+            if piece is not None and piece._color == color:
+                for move_to in self._piece_moves(square):
+                    yield square, move_to
+
+    def _piece_moves(self, square):
+        """
+        Generates destination square indices for the piece on square using the
+        precomputed move tables. Follows the same rules as allowable_move.
+        """
+        board = self._chess_board
+        piece = board[square]
+        if piece is None:
+            return
+
+        color = piece._color
+        piece_type = piece._piece_type
+
+        if piece_type == 'Pawn':
+            step = 8 if color == 'WHITE' else -8
+            start_row = 1 if color == 'WHITE' else 6
+            forward = square + step
+
+            # Pawns on the last row have nowhere to go forward
+            if 0 <= forward < 64 and board[forward] is None:
+                yield forward
+
+                # Special piece move (only during initial move)
+                double = forward + step
+                if square >> 3 == start_row and board[double] is None:
+                    yield double
+
+            for target in PAWN_CAPTURES[color][square]:
+                target_piece = board[target]
+                if target_piece is not None and target_piece._color != color:
+                    yield target
+
+        elif piece_type in SLIDING_RAYS:
+            for ray in SLIDING_RAYS[piece_type][square]:
+                for target in ray:
+                    target_piece = board[target]
+                    if target_piece is None:
+                        yield target
+                    else:
+                        if target_piece._color != color:
+                            yield target
+                        break  # Path is blocked
+
+        else:
+            # Knights and kings jump straight to their target square
+            jumps = KNIGHT_MOVES if piece_type == 'Knight' else KING_MOVES
+            for target in jumps[square]:
+                target_piece = board[target]
+                if target_piece is None or target_piece._color != color:
+                    yield target
+
     def is_game_ongoing(self):
         return self._get_game_state == 'UNFINISHED'
 
     def is_valid_move(self, move_from, move_to):
-        from_row, from_column = self.move_conversion(move_from)
-        
-        moving_piece = self._chess_board[from_row][from_column]
+        return self._is_valid_move(self.move_conversion(move_from), self.move_conversion(move_to))
+
+    def _is_valid_move(self, from_square, to_square):
+        """Checks a move between square indices for the player whose turn it is"""
+        moving_piece = self._chess_board[from_square]
         if not moving_piece or moving_piece._color != self._game_turn:
             return False
 
-        return moving_piece.allowable_move(move_to, self._chess_board)
-
-    def execute_move(self, move_from, move_to):
-        from_row, from_column = self.move_conversion(move_from)
-        to_row, to_column = self.move_conversion(move_to)
+        return moving_piece.allowable_move(from_square, to_square, self._chess_board)
 
-        moving_piece = self._chess_board[from_row][from_column]
-        target_square = self._chess_board[to_row][to_column]
+    def execute_move(self, from_square, to_square):
+        """Moves the piece between square indices, capturing whatever is on to_square"""
+        moving_piece = self._chess_board[from_square]
+        target_square = self._chess_board[to_square]
 
         if target_square:
-            self.capture_piece(to_row, to_column)
+            self.capture_piece(to_square)
 
-        self._chess_board[to_row][to_column] = moving_piece
-        self._chess_board[from_row][from_column] = None
-        moving_piece.update_position(move_to)
+        self._set_square(to_square, moving_piece)
+        self._set_square(from_square, None)
+
+    def _set_square(self, square, piece):
+        """
+        Puts piece (or None) on the square index. Every change to the board
+        goes through here so other board representations can follow along.
+        """
+        if self._board_shared:
+            self._chess_board = list(self._chess_board)
+            self._board_shared = False
+            if self._attack_map is not None:
+                self._attack_map._board = self._chess_board
+        previous = self._chess_board[square]
+        if previous is not None:
+            self._zobrist_key ^= ZOBRIST_PIECES[previous._color][previous._piece_type][square]
+        if piece is not None:
+            self._zobrist_key ^= ZOBRIST_PIECES[piece._color][piece._piece_type][square]
+        self._chess_board[square] = piece
+        if self._attack_map is not None:
+            self._attack_map.update(square, previous, piece)
 
     def switch_turn(self):
         self._game_turn = 'BLACK' if self._game_turn == 'WHITE' else 'WHITE'
+        self._zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
 
     def move_conversion(self, algebraic_notation):
         """
-        Convert algebraic notation to board row and column indices to make logical move
+        Convert algebraic notation to the board square index to make logical move
         """
-        column_map = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-        column = column_map[algebraic_notation[0]]
-        row = int(algebraic_notation[1]) - 1
-        return row, column
+        return SQUARE_INDEX[algebraic_notation]
 
-    def capture_piece(self, row, column):
+    def capture_piece(self, square):
         """
-        Captures a piece at the specified location, updates captured count,
+        Captures a piece at the specified square index, updates captured count,
         and removes the piece from the board.
         """
-        captured_piece = self._chess_board[row][column]
+        captured_piece = self._chess_board[square]
         if captured_piece:
+            if self._material_shared:
+                self._unshare_material()
+
             # Update captured piece count
             color = captured_piece._color
             piece_type = captured_piece._piece_type
-            self._captured_counts[color][piece_type] = self._captured_counts[color].get(piece_type, 0) + 1
+            count = self._captured_counts[color].get(piece_type, 0)
+            self._captured_counts[color][piece_type] = count + 1
+            captured_keys = ZOBRIST_CAPTURED[color][piece_type]
+            self._zobrist_key ^= captured_keys[count] ^ captured_keys[count + 1]
+
+            # Update the pieces left
+            self._remaining[color][piece_type] -= 1
 
             # Remove the captured piece from the board
-            self._chess_board[row][column] = None
+            self._set_square(square, None)
 
             # Check for victory condition
             if self.check_win(piece_type, color):
@@ -170,39 +866,77 @@ class ChessVar:
 
                 # self._game_state = 'WHITE_WON' if color == 'BLACK' else 'BLACK_WON'
 
+    def _wins_by_capture(self, to_square):
+        """Returns True if capturing on the square index takes the last piece of a type, winning the game"""
+        victim = self._chess_board[to_square]
+        return victim is not None and self._remaining[victim._color][victim._piece_type] == 1
+
     def check_win(self, piece_type, opponent_color):
         """
         Validates if all types of a specific piece have been captured for a win.
+        The queen needs no special case as there is only one of it.
+        """
+        return self._remaining[opponent_color][piece_type] == 0
+
+    def get_game_state(self):
+        """
+        Returns the current state of the game, as kept up to date by capture_piece.
         """
+        return self._get_game_state
 
-        # Total number of each piece to calculate from
-        total_pieces = {'Pawn': 8, 'Knight': 2, 'Bishop': 2, 'Rook': 2, 'Queen': 1, 'King': 1}
+    def meet_win_condition(self, piece_type, count):
+        """
+        Check if win condition is met for a specific piece type.
+        """
+        return count == PIECE_TOTALS[piece_type]
 
-        captured_count = self._captured_counts[opponent_color].get(piece_type, 0)
+    def remaining(self, color, piece_type):
+        """Returns how many pieces of piece_type color has left"""
+        return self._remaining[color][piece_type]
 
-        # Check if all pieces of a type have been captured or if the Queen has been captured
-        return captured_count == total_pieces[piece_type] or (piece_type == 'Queen' and captured_count == 1)
+    def repetitions(self):
+        """Returns how many times the current position has come up, this time included"""
+        count = self._position_counts.get(self._zobrist_key)
+        return count if count is not None else self._shared_position_count(self._zobrist_key)
 
-    def get_game_state(self):
+    def plies_played(self):
+        """Returns the number of moves that can be taken back with pop, from before any fork too"""
+        return len(self._move_stack) + (self._history[3] if self._history is not None else 0)
+
+    def plies_since_capture(self):
+        """Returns the plies played since the last capture"""
+        return self._plies_since_capture
+
+    def closest_loss(self, color):
         """
-        Returns the current state of the game.
+        Returns the fewest pieces color has left of any type it started with
+        several of, the number of captures that lose the game that way. Queens
+        and kings are left out, they are always one capture from losing.
         """
+        remaining = self._remaining[color]
+        return min(remaining[piece_type] for piece_type in MULTIPLE_TYPES)
 
-        # Check if all of a certain type of piece for either player have been captured
-        for color, captured in self._captured_counts.items():
-            for piece_type, count in captured.items():
-                if self.meet_win_condition(piece_type, count):
-                    return 'WHITE_WON' if color == 'BLACK' else 'BLACK_WON'
-
-        # If no victory condition is met, the game is still unfinished
-        return 'UNFINISHED'
+    def attack_map(self):
+        """
+        Returns the AttackMap of the board. It is built on the first call and
+        then kept up to date move by move, so games that never ask pay nothing.
+        """
+        if self._attack_map is None:
+            self._attack_map = AttackMap(self._chess_board)
+        return self._attack_map
 
-    def meet_win_condition(self, piece_type, count):
+    def attackers_of(self, square, color=None):
         """
-        Check if win condition is met for a specific piece type.
+        Returns the squares, in algebraic notation, of the pieces attacking
+        square, only color's pieces when color is given
         """
-        total_pieces = {'Pawn': 8, 'Knight': 2, 'Bishop': 2, 'Rook': 2, 'Queen': 1, 'King': 1}
-        return count == total_pieces[piece_type]
+        board = self._chess_board
+        return sorted((SQUARE_NAMES[attacker] for attacker in self.attack_map().attackers(SQUARE_INDEX[square])
+                       if color is None or board[attacker]._color == color), key=SQUARE_INDEX.get)
+
+    def is_attacked(self, square, by):
+        """Returns True if any of by's pieces attack square"""
+        return self.attack_map().count(SQUARE_INDEX[square], by) > 0
 
 
 class ChessPiece:
@@ -211,29 +945,25 @@ class ChessPiece:
     regarding legal moves for the chess. ChessPieces and it's inheritance will
     communicate with chessboard to optimize current chess status and positions
 
-    data_members: chess piece name, allowed legal moves
+    Pieces hold no position, so one object per color and type (see PIECES) is
+    shared by every square and every game. The square is passed in instead.
+
+    data_members: chess piece name, color, icon
     """
 
-    def __init__(self, piece_type, color, position):
+    __slots__ = ('_piece_type', '_color', '_icon')
+
+    def __init__(self, piece_type, color):
         """
         Initializing chess piece shared data members
         """
         self._piece_type = piece_type
         self._color = color
-        self._position = position
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
+    def allowable_move(self, from_square, to_square, board):
         """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
-        """
-        Determine if a move to a new position is legal for this piece, given the current
-        state of the board. This method will be overridden in subclasses for specific pieces.
+        Determine if a move between square indices is legal for this piece, given the
+        current state of the board. This method will be overridden in subclasses for specific pieces.
         """
         raise ImplementInSubClass('Use method in subclass')
 
@@ -244,9 +974,11 @@ class Pawn(ChessPiece):
     move set for pawn
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('Pawn', color, position)
+        super().__init__('Pawn', color)
 
         self._icon = 'wP' if self._color == 'WHITE' else 'bP'  # wP for white pawn and bP for black pawn
 
@@ -255,68 +987,48 @@ class Pawn(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """determines a valid move for pawn"""
 
-        # Matching each colum to their respective letter
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         # Check if the move is a valid forward move
         if self._color == 'WHITE':
             # Standard movement for pawn
             if current_column == new_column and new_row == current_row + 1:
-                return board[current_row][current_column] is None
+                return board[to_square] is None
 
             # Special piece move (only during initial move)
-            elif current_row == 2 and current_column == new_column and new_row == 4:
-                return board[3][current_column] is None and board[2][current_column] is None
-
-            # elif current_row == 2 and current_column == new_column and new_row == 4:
-            #     return board[2][current_column] is None and board[3][current_column] is None
+            elif current_row == 1 and current_column == new_column and new_row == 3:
+                return board[from_square + 8] is None and board[to_square] is None
 
             # Capturing diagonal move for pawn
             elif new_row == current_row + 1 and abs(new_column - current_column) == 1:
-                return self.is_capture_move(new_column, new_row, board)
+                return self.is_capture_move(to_square, board)
 
         elif self._color == 'BLACK':
             # Standard movement for pawn
             if current_column == new_column and new_row == current_row - 1:
-                return board[current_row - 2][current_column] is None
+                return board[to_square] is None
 
             # Special piece move (only during initial move)
-            elif current_row == 7 and current_column == new_column and new_row == 5:
-                return board[4][current_column] is None and board[5][current_column] is None
+            elif current_row == 6 and current_column == new_column and new_row == 4:
+                return board[from_square - 8] is None and board[to_square] is None
 
             # Capturing diagonal move for pawn
             elif new_row == current_row - 1 and abs(new_column - current_column) == 1:
-                return self.is_capture_move(new_column, new_row, board)
+                return self.is_capture_move(to_square, board)
 
         return False  # Not a valid move
 
-    def is_capture_move(self, new_column, new_row, board):
+    def is_capture_move(self, to_square, board):
         """
         Check if the move is a capturing move.
         """
-        # Adjusting due to zero based indexing
-        row_index = new_row - 1
-
         # Setting capture boundary
-        if 0 <= row_index < 8 and 0 <= new_column < 8:
-            targeted_capture = board[row_index][new_column]
+        if 0 <= to_square < 64:
+            targeted_capture = board[to_square]
 
             # validate opponent's piece
             if targeted_capture is not None:
@@ -333,9 +1045,11 @@ class Knight(ChessPiece):
     what they land on.
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('Knight', color, position)
+        super().__init__('Knight', color)
 
         self._icon = 'wK' if self._color == 'WHITE' else 'bK'  # wK for white knight and bK for black knight
 
@@ -344,26 +1058,12 @@ class Knight(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """
         Determines a valid move for knight.
         """
-        # Matching each column to their respective letter
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         # Calculate the move's row and column differences
         row_diff = abs(new_row - current_row)
@@ -374,7 +1074,7 @@ class Knight(ChessPiece):
 
             # Knights can jump over other pieces, no need to check path
             # Checks if landing on an opponent's piece or empty square
-            target_square = board[new_row - 1][new_column]
+            target_square = board[to_square]
             if target_square is None or target_square._color != self._color:
                 return True
 
@@ -386,9 +1086,11 @@ class Bishop(ChessPiece):
     Class inherited from ChessPiece to represent a Bishop.
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('Bishop', color, position)
+        super().__init__('Bishop', color)
 
         self._icon = 'wB' if self._color == 'WHITE' else 'bB'  # wB for white bishop and bB for black bishop
 
@@ -397,25 +1099,12 @@ class Bishop(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """
         Determines a valid move for bishop based on diagonal movement.
         """
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         # Checks for diagonal movement
         if abs(new_column - current_column) == abs(new_row - current_row):
@@ -423,13 +1112,14 @@ class Bishop(ChessPiece):
             # Ensure path is clear - bishops have no hops (can't jump)
             column_step = 1 if new_column > current_column else -1
             row_step = 1 if new_row > current_row else -1
+            square_step = row_step * 8 + column_step
 
             for step in range(1, abs(new_column - current_column)):
-                if board[current_row + step * row_step - 1][current_column + step * column_step] is not None:
+                if board[from_square + step * square_step] is not None:
                     return False  # Path is blocked
 
             # Checks if the target square is either empty or has an opponent's piece
-            target_square = board[new_row - 1][new_column]
+            target_square = board[to_square]
             if target_square is None or target_square._color != self._color:
                 return True
 
@@ -442,9 +1132,11 @@ class Rook(ChessPiece):
     Rooks can move horizontally or vertically any number of squares, as long as the path is not blocked.
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('Rook', color, position)
+        super().__init__('Rook', color)
 
         self._icon = 'wR' if self._color == 'WHITE' else 'bR'  # wR for white rook and bR for black rook
 
@@ -453,41 +1145,29 @@ class Rook(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """
         Determines a valid move for rook based on horizontal or vertical movement.
         """
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         # Check for horizontal or vertical movement
         if current_column == new_column or current_row == new_row:
             # Determine the direction of movement
             column_step = 0 if current_column == new_column else (1 if new_column > current_column else -1)
             row_step = 0 if current_row == new_row else (1 if new_row > current_row else -1)
+            square_step = row_step * 8 + column_step
 
             # This one is a straight shooter
             # Picks the none zero value since it is always going to move straight in one direction
             steps = max(abs(new_column - current_column), abs(new_row - current_row))
             for step in range(1, steps):
-                if board[current_row + step * row_step - 1][current_column + step * column_step] is not None:
+                if board[from_square + step * square_step] is not None:
                     return False  # Path is blocked
 
             # Check if the target square is either empty or has an opponent's piece
-            target_square = board[new_row - 1][new_column]
+            target_square = board[to_square]
             if target_square is None or target_square._color != self._color:
                 return True
 
@@ -500,9 +1180,11 @@ class Queen(ChessPiece):
     Queens have the combined movement of a rook and bishop
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('Queen', color, position)
+        super().__init__('Queen', color)
 
         self._icon = 'wQ' if self._color == 'WHITE' else 'bQ'  # wQ for white queen and bQ for black queen
 
@@ -511,25 +1193,12 @@ class Queen(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """
         Determines a valid move for queen based on horizontal, vertical, and diagonal movement.
         """
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         column_diff = abs(new_column - current_column)
         row_diff = abs(new_row - current_row)
@@ -538,14 +1207,15 @@ class Queen(ChessPiece):
         if current_column == new_column or current_row == new_row or column_diff == row_diff:
             column_step = 0 if current_column == new_column else (1 if new_column > current_column else -1)
             row_step = 0 if current_row == new_row else (1 if new_row > current_row else -1)
+            square_step = row_step * 8 + column_step
 
             steps = max(column_diff, row_diff)
             for step in range(1, steps):
-                if board[current_row + step * row_step - 1][current_column + step * column_step] is not None:
+                if board[from_square + step * square_step] is not None:
                     return False  # Path is blocked
 
             # Check if the target square is either empty or has an opponent's piece
-            target_square = board[new_row - 1][new_column]
+            target_square = board[to_square]
             if target_square is None or target_square._color != self._color:
                 return True
 
@@ -557,9 +1227,11 @@ class King(ChessPiece):
     Class inherited from ChessPiece to represent a King.
     """
 
-    def __init__(self, color, position):
+    __slots__ = ()
+
+    def __init__(self, color):
         """Initializing data members from parent class"""
-        super().__init__('King', color, position)
+        super().__init__('King', color)
 
         self._icon = 'wK' if self._color == 'WHITE' else 'bK'  # wK for white king and bP for black king
 
@@ -568,25 +1240,12 @@ class King(ChessPiece):
 
         return self._icon
 
-    def update_position(self, new_position):
-        """
-        Updates the piece's position to the new position.
-        """
-        self._position = new_position
-
-        return self._position
-
-    def allowable_move(self, new_position, board):
+    def allowable_move(self, from_square, to_square, board):
         """
         Determines a valid move for king based on its movement capabilities.
         """
-        assigned_column = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
-
-        current_column = assigned_column[self._position[0]]
-        new_column = assigned_column[new_position[0]]
-
-        current_row = int(self._position[1])
-        new_row = int(new_position[1])
+        current_row, current_column = divmod(from_square, 8)
+        new_row, new_column = divmod(to_square, 8)
 
         # Check if the move is one square in any direction
         column_diff = abs(new_column - current_column)
@@ -594,12 +1253,18 @@ class King(ChessPiece):
 
         if column_diff <= 1 and row_diff <= 1:
             # Check if the target square is either empty or has an opponent's piece
-            target_square = board[new_row - 1][new_column]
+            target_square = board[to_square]
             if target_square is None or target_square._color != self._color:
                 return True
 
         return False  # Not a valid move
 
+
+# The shared piece objects, one per color and type, used on every board
+PIECES = {color: {piece_class.__name__: piece_class(color) for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)}
+          for color in ('WHITE', 'BLACK')}
+
+
 def main():
     # Initialize the chess game
     game = ChessVar()
@@ -0,0 +1,206 @@
+"""
+Streaming analysis of large position files. Positions, one to_text line each,
+are read lazily, analysed in chunks by worker processes with the ChessVar
+move rules, and written as they come back to a columnar file. The file holds
+one block per chunk, and each block stores every column as a packed array.
+Memory stays flat however big the input is.
+
+Every position gets one row: side to move, game state, move count per side,
+capture moves per side by the type of piece captured, and flags for a side
+having a pawn, knight, bishop or rook type down to its last piece, and for a
+side being able to win with its next capture.
+
+    python analysis.py positions.txt positions.cols --workers 8
+    python analysis.py --summary positions.cols
+"""
+
+import argparse
+import struct
+import sys
+from array import array
+
+from Modified_chess import STATE_CODES, PIECE_LETTERS
+from bitboard import BACKENDS
+from replay import map_chunks
+
+MAGIC = b'CVCOLS1\0'
+BLOCK_HEADER = struct.Struct('<I')  # rows in the block
+
+# Flag bits
+VALID = 1  # The line parsed as a position, every other column is 0 otherwise
+WHITE_ONE_FROM_LOSING = 2  # White has a piece type other than queen and king down to its last piece
+BLACK_ONE_FROM_LOSING = 4
+WHITE_CAN_WIN = 8  # White can capture the last piece of one of black's types
+BLACK_CAN_WIN = 16
+
+COLORS = ('WHITE', 'BLACK')
+
+# (name, array typecode) of every column, in file order
+COLUMNS = ([('flags', 'B'), ('turn', 'B'), ('state', 'B'), ('white_moves', 'H'), ('black_moves', 'H')] +
+           [(f'{color.lower()}_captures_{piece_type.lower()}', 'B')
+            for color in COLORS for piece_type in PIECE_LETTERS])
+
+
+def read_positions(path):
+    """Generates the position lines of a file one at a time, skipping blanks and # comments"""
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def analyze_position(text, backend='board'):
+    """Returns the row of column values for one position line"""
+    try:
+        game = BACKENDS[backend].from_text(text)
+    except (ValueError, KeyError, IndexError):
+        return [0] * len(COLUMNS)
+
+    flags = VALID
+    board = game._chess_board
+    move_counts = []
+    capture_counts = []
+    for color, one_from_losing, can_win in ((COLORS[0], WHITE_ONE_FROM_LOSING, WHITE_CAN_WIN),
+                                            (COLORS[1], BLACK_ONE_FROM_LOSING, BLACK_CAN_WIN)):
+        if game.closest_loss(color) == 1:
+            flags |= one_from_losing
+
+        # Like legal_moves, a finished game has no moves for either side
+        moves = 0
+        captures = dict.fromkeys(PIECE_LETTERS, 0)
+        if game.is_game_ongoing():
+            for _, to_square in game._generate_moves(color):
+                moves += 1
+                victim = board[to_square]
+                if victim is not None:
+                    captures[victim._piece_type] += 1
+                    if game._wins_by_capture(to_square):
+                        flags |= can_win
+
+        move_counts.append(moves)
+        capture_counts.extend(captures.values())
+
+    return [flags, game.get_game_turn() == 'BLACK', STATE_CODES[game.get_game_state()]] + move_counts + capture_counts
+
+
+def analyze_chunk(lines, backend='board'):
+    """Analyses a list of position lines in a worker and returns their columns as packed bytes"""
+    columns = [array(typecode) for _, typecode in COLUMNS]
+    for line in lines:
+        for column, value in zip(columns, analyze_position(line, backend)):
+            column.append(value)
+
+    if sys.byteorder == 'big':
+        for column in columns:
+            column.byteswap()  # The file is little-endian
+    return len(lines), [column.tobytes() for column in columns]
+
+
+def write_header(file):
+    """Writes the magic and the column names and types"""
+    file.write(MAGIC + struct.pack('<H', len(COLUMNS)))
+    for name, typecode in COLUMNS:
+        file.write(struct.pack('<B', len(name)) + name.encode() + typecode.encode())
+
+
+def analyze_file(input_path, output_path, workers=None, chunk_size=1000, max_pending=None, backend='board'):
+    """
+    Analyses every position in input_path into the columnar file output_path,
+    a block per chunk written as soon as it is done, and returns the number
+    of rows written
+    """
+    rows = 0
+    with open(output_path, 'wb') as output:
+        write_header(output)
+        for count, columns in map_chunks(analyze_chunk, read_positions(input_path), (backend,),
+                                         workers, chunk_size, max_pending):
+            output.write(BLOCK_HEADER.pack(count))
+            for data in columns:
+                output.write(data)
+            rows += count
+    return rows
+
+
+def read_blocks(path):
+    """
+    Generates each block of a columnar file as a dict of column name to
+    array, one block in memory at a time
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('not a position analysis file: ' + path)
+        columns = []
+        for _ in range(struct.unpack('<H', file.read(2))[0]):
+            name_length = file.read(1)[0]
+            name = file.read(name_length).decode()
+            columns.append((name, file.read(1).decode()))
+
+        while True:
+            header = file.read(BLOCK_HEADER.size)
+            if not header:
+                return
+            count, = BLOCK_HEADER.unpack(header)
+            block = {}
+            for name, typecode in columns:
+                column = array(typecode)
+                column.frombytes(file.read(count * column.itemsize))
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                block[name] = column
+            yield block
+
+
+def read_column(path, name):
+    """Returns one column of the whole file as an array"""
+    result = None
+    for block in read_blocks(path):
+        if result is None:
+            result = array(block[name].typecode)
+        result.extend(block[name])
+    return result if result is not None else array('B')
+
+
+def summarize(path):
+    """Returns totals over a columnar file: rows, valid rows, flag counts and mean move counts"""
+    totals = {'rows': 0, 'valid': 0, 'white_one_from_losing': 0, 'black_one_from_losing': 0,
+              'white_can_win': 0, 'black_can_win': 0, 'white_moves': 0, 'black_moves': 0}
+    for block in read_blocks(path):
+        totals['rows'] += len(block['flags'])
+        for flags in block['flags']:
+            totals['valid'] += flags & VALID
+            totals['white_one_from_losing'] += bool(flags & WHITE_ONE_FROM_LOSING)
+            totals['black_one_from_losing'] += bool(flags & BLACK_ONE_FROM_LOSING)
+            totals['white_can_win'] += bool(flags & WHITE_CAN_WIN)
+            totals['black_can_win'] += bool(flags & BLACK_CAN_WIN)
+        totals['white_moves'] += sum(block['white_moves'])
+        totals['black_moves'] += sum(block['black_moves'])
+
+    for color in ('white', 'black'):
+        totals[f'mean_{color}_moves'] = totals.pop(f'{color}_moves') / totals['valid'] if totals['valid'] else 0.0
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse ChessVar positions into a columnar file')
+    parser.add_argument('input', nargs='?', help='file with one to_text position per line')
+    parser.add_argument('output', nargs='?', help='columnar file to write')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: every core)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='positions per worker task and block')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='board')
+    parser.add_argument('--summary', metavar='COLUMNS_FILE', help='print totals of a columnar file instead')
+    args = parser.parse_args(argv)
+
+    if args.summary:
+        for name, value in summarize(args.summary).items():
+            print(f'{name}: {value:.2f}' if isinstance(value, float) else f'{name}: {value}')
+        return
+
+    if not args.input or not args.output:
+        parser.error('give an input and an output file, or --summary')
+    rows = analyze_file(args.input, args.output, args.workers, args.chunk_size, backend=args.backend)
+    print(f'{rows} positions analysed into {args.output}')
+
+
+if __name__ == '__main__':
+    main()
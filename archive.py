@@ -0,0 +1,231 @@
+"""
+Append-only binary game archive. Moves take 2 bytes each (from square, to
+square), and every checkpoint_every plies the packed position is stored too,
+with the plies since the last capture. Any ply of any game is rebuilt by
+replaying from the checkpoint before the last capture, so the draw rules see
+every position that could still repeat.
+
+An archive is two files. <path>.moves holds each game's moves followed by its
+checkpoints, and <path>.index holds a header then one fixed-size record per
+game (data offset, plies, checkpoints, final state). Readers mmap both files.
+
+    python archive.py add games.jsonl games --checkpoint-every 16
+    python archive.py show games --game 3 --ply 120
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from Modified_chess import ChessVar, SQUARE_NAMES, POSITION_BYTES, STATE_CODES, CODE_STATES, parse_move
+from replay import read_games
+
+# Index header: magic, checkpoint interval
+INDEX_HEADER = struct.Struct('<8sI')
+MAGIC = b'CVARCH2\0'
+
+# Index record: offset of the game in the moves file, plies, checkpoints, final state code
+INDEX_RECORD = struct.Struct('<QIIB')
+
+# Checkpoint: packed position, plies since the last capture
+CHECKPOINT = struct.Struct(f'<{POSITION_BYTES}sI')
+
+
+class ArchiveWriter:
+    """Appends games to an archive, creating it if needed"""
+
+    def __init__(self, path, checkpoint_every=16):
+        """Opens the archive files for appending"""
+        self._index_path = path + '.index'
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path) >= INDEX_HEADER.size:
+            with open(self._index_path, 'rb') as file:
+                magic, existing = INDEX_HEADER.unpack(file.read(INDEX_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError('not a game archive: ' + path)
+            if existing != checkpoint_every:
+                raise ValueError(f'archive checkpoints every {existing} plies, not {checkpoint_every}')
+            self._index = open(self._index_path, 'ab')
+        else:
+            if checkpoint_every < 1:
+                raise ValueError('checkpoint_every must be at least 1')
+            self._index = open(self._index_path, 'wb')
+            self._index.write(INDEX_HEADER.pack(MAGIC, checkpoint_every))
+
+        self._moves = open(path + '.moves', 'ab')
+        self._checkpoint_every = checkpoint_every
+
+    def append(self, moves):
+        """
+        Plays moves from the starting position, appends the game and returns its
+        number in the archive. Raises ValueError at the first illegal move.
+        """
+        game = ChessVar()
+        move_bytes = bytearray()
+        checkpoints = [CHECKPOINT.pack(game.to_bytes(), 0)]
+        for ply, move in enumerate(moves, 1):
+            move_from, move_to = parse_move(move) if isinstance(move, str) else move
+            if not game.make_move(move_from, move_to):
+                raise ValueError(f'illegal move {move_from}{move_to} at ply {ply}')
+
+            move_bytes += bytes((game.move_conversion(move_from), game.move_conversion(move_to)))
+            if ply % self._checkpoint_every == 0:
+                checkpoints.append(CHECKPOINT.pack(game.to_bytes(), game.plies_since_capture()))
+
+        # The index record is written last, so a game is only visible once complete
+        offset = self._moves.tell()
+        self._moves.write(move_bytes)
+        self._moves.write(b''.join(checkpoints))
+        self._moves.flush()
+
+        number = (self._index.tell() - INDEX_HEADER.size) // INDEX_RECORD.size
+        self._index.write(INDEX_RECORD.pack(offset, len(move_bytes) // 2, len(checkpoints),
+                                            STATE_CODES[game.get_game_state()]))
+        self._index.flush()
+        return number
+
+    def close(self):
+        """Closes the archive files"""
+        self._moves.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def map_file(path):
+    """Memory-maps a file read-only, an empty file maps to empty bytes"""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ArchiveReader:
+    """Random access to the games and plies of an archive through mmap"""
+
+    def __init__(self, path):
+        """Maps the archive files and checks the index header"""
+        self._index = map_file(path + '.index')
+        self._moves = map_file(path + '.moves')
+        if len(self._index) < INDEX_HEADER.size:
+            raise ValueError('not a game archive: ' + path)
+
+        magic, self._checkpoint_every = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != MAGIC:
+            raise ValueError('not a game archive: ' + path)
+        self._count = (len(self._index) - INDEX_HEADER.size) // INDEX_RECORD.size
+
+    def __len__(self):
+        """Returns the number of games"""
+        return self._count
+
+    def close(self):
+        """Unmaps the archive files"""
+        for mapped in (self._index, self._moves):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, number):
+        """Returns (offset, plies, checkpoints, final state code) of game number"""
+        if not 0 <= number < self._count:
+            raise IndexError(f'no game {number} in an archive of {self._count}')
+        return INDEX_RECORD.unpack_from(self._index, INDEX_HEADER.size + number * INDEX_RECORD.size)
+
+    def plies(self, number):
+        """Returns how many plies game number has"""
+        return self._record(number)[1]
+
+    def moves(self, number):
+        """Returns the moves of game number as (move_from, move_to) pairs"""
+        offset, plies, _, _ = self._record(number)
+        data = self._moves[offset:offset + plies * 2]
+        return [(SQUARE_NAMES[data[index]], SQUARE_NAMES[data[index + 1]]) for index in range(0, plies * 2, 2)]
+
+    def _checkpoint(self, offset, plies, checkpoint):
+        """Returns (packed position, plies since capture) of a checkpoint of the game at offset"""
+        return CHECKPOINT.unpack_from(self._moves, offset + plies * 2 + checkpoint * CHECKPOINT.size)
+
+    def state(self, number):
+        """Returns the state game number ended in"""
+        return CODE_STATES[self._record(number)[3]]
+
+    def position(self, number, ply):
+        """
+        Returns a ChessVar at the position after ply plies of game number. The
+        moves are replayed from the last checkpoint before the last capture,
+        as earlier positions can never come up again, so the repetition counts
+        and plies since the last capture are those of the original game.
+        """
+        offset, plies, _, state_code = self._record(number)
+        if not 0 <= ply <= plies:
+            raise IndexError(f'game {number} has {plies} plies, not {ply}')
+
+        checkpoint = ply // self._checkpoint_every
+        _, plies_since_capture = self._checkpoint(offset, plies, checkpoint)
+        checkpoint = (checkpoint * self._checkpoint_every - plies_since_capture) // self._checkpoint_every
+
+        position, plies_since_capture = self._checkpoint(offset, plies, checkpoint)
+        game = ChessVar.from_bytes(position)
+        game._plies_since_capture = plies_since_capture
+
+        # Archived moves were checked when written, so they are pushed unvalidated
+        for index in range(checkpoint * self._checkpoint_every, ply):
+            game._push(self._moves[offset + index * 2], self._moves[offset + index * 2 + 1])
+        if ply == plies:
+            game.set_game_state(CODE_STATES[state_code])
+        return game
+
+    def __iter__(self):
+        """Generates the moves of every game in order"""
+        for number in range(self._count):
+            yield self.moves(number)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Store ChessVar games in a compact binary archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = commands.add_parser('add', help='append games from a JSONL or text file')
+    add_parser.add_argument('games', help='JSONL or text file with one game per line')
+    add_parser.add_argument('archive', help='archive path, without the .moves/.index suffix')
+    add_parser.add_argument('--checkpoint-every', type=int, default=16)
+
+    show_parser = commands.add_parser('show', help='print a game at a given ply')
+    show_parser.add_argument('archive', help='archive path, without the .moves/.index suffix')
+    show_parser.add_argument('--game', type=int, default=0)
+    show_parser.add_argument('--ply', type=int, default=None, help='ply to show (default: last)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'add':
+        added = skipped = 0
+        with ArchiveWriter(args.archive, args.checkpoint_every) as writer:
+            for game_id, moves in read_games(args.games):
+                if moves is None:
+                    skipped += 1
+                    continue
+                try:
+                    writer.append(moves)
+                    added += 1
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+        print(f'{added} games added, {skipped} unreadable or with illegal moves skipped')
+    else:
+        with ArchiveReader(args.archive) as reader:
+            ply = reader.plies(args.game) if args.ply is None else args.ply
+            game = reader.position(args.game, ply)
+            game.print_chessboard()
+            print(game.to_text())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Move validation for many boards at once with NumPy. Boards are (N, 8, 8) int8
+arrays indexed [row, column] from a1, holding the piece codes of
+ChessVar.to_bytes: 1 to 6 for Pawn, Knight, Bishop, Rook, Queen, King and
+8 more for black, 0 for empty. The rules are the ones of the pieces'
+allowable_move, turned once at import into tables of where each piece can
+go on an empty board and which squares lie in between, so validating a
+batch is a few gathers. The answers match ChessVar.is_valid_move for the
+side to move exactly.
+
+This module needs numpy, which the rest of the package does not.
+
+    python batch_validation.py --positions 2000 --moves 200
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from Modified_chess import (ChessVar, SQUARE_NAMES, PIECE_LETTERS, KNIGHT_MOVES, KING_MOVES, PAWN_CAPTURES,
+                            SLIDING_RAYS, QUEEN_RAYS)
+
+PIECE_CODES = {piece_type: code for code, piece_type in enumerate(PIECE_LETTERS, 1)}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = (PIECE_CODES[piece_type] for piece_type in PIECE_LETTERS)
+BLACK_CODE = 8
+SIDES = {'WHITE': 0, 'BLACK': 1}
+
+# How a piece may reach a square: not at all, onto an empty or enemy square,
+# and for pawns pushing onto an empty square or capturing an enemy piece
+NO_MOVE, MOVE, PAWN_PUSH, PAWN_CAPTURE = range(4)
+
+# Squares between is padded with this index, a cell appended to every board that is always empty
+PADDING = 64
+
+
+def move_kind_table():
+    """
+    Builds the (piece code, from square * 64 + to square) table of how each
+    colored piece reaches each square on an empty board
+    """
+    table = np.zeros((16, 4096), dtype=np.int8)
+    for color, color_code in SIDES.items():
+        code = color_code * BLACK_CODE
+        step, start_row = (8, 1) if color == 'WHITE' else (-8, 6)
+        for square in range(64):
+            forward = square + step
+            if 0 <= forward < 64:
+                table[code | PAWN, square << 6 | forward] = PAWN_PUSH
+                if square >> 3 == start_row:
+                    table[code | PAWN, square << 6 | forward + step] = PAWN_PUSH
+            for target in PAWN_CAPTURES[color][square]:
+                table[code | PAWN, square << 6 | target] = PAWN_CAPTURE
+            for piece_type, jumps in (('Knight', KNIGHT_MOVES), ('King', KING_MOVES)):
+                for target in jumps[square]:
+                    table[code | PIECE_CODES[piece_type], square << 6 | target] = MOVE
+            for piece_type, rays in SLIDING_RAYS.items():
+                for ray in rays[square]:
+                    for target in ray:
+                        table[code | PIECE_CODES[piece_type], square << 6 | target] = MOVE
+    return table
+
+
+def move_rule_table():
+    """
+    Builds the flat table answering whether a piece code may move between two
+    squares onto a square holding a target code, all but the squares in
+    between checked. It is indexed by piece << 16 | from << 10 | to << 4 | target.
+    """
+    codes = np.arange(16)
+    # 0 for an empty target, 1 for an enemy piece and 2 for an own piece
+    relation = np.where(codes[None, :] == 0, 0, np.where(codes[:, None] >> 3 != codes[None, :] >> 3, 1, 2))
+    allowed = np.array([[False, False, False],  # NO_MOVE
+                        [True, True, False],  # MOVE
+                        [True, False, False],  # PAWN_PUSH
+                        [False, True, False]])  # PAWN_CAPTURE
+    return allowed[move_kind_table()[:, :, None], relation[:, None, :]].ravel()
+
+
+def between_table():
+    """
+    Builds the (from square * 64 + to square, 8) table of the squares strictly
+    between two squares on a shared line, padded with PADDING. Eight columns
+    let the gathered cells of a move be read as one 64-bit integer.
+    """
+    table = np.full((4096, 8), PADDING, dtype=np.int8)
+    for square in range(64):
+        for ray in QUEEN_RAYS[square]:
+            for distance, target in enumerate(ray):
+                table[square << 6 | target, :distance] = ray[:distance]
+    return table
+
+
+MOVE_RULES = move_rule_table()
+BETWEEN = between_table()
+HAS_BETWEEN = BETWEEN[:, 0] != PADDING
+
+
+def to_array(game):
+    """Returns game's board as an (8, 8) int8 array of piece codes"""
+    board = np.zeros(64, dtype=np.int8)
+    for square, piece in enumerate(game._chess_board):
+        if piece is not None:
+            board[square] = PIECE_CODES[piece._piece_type] | (BLACK_CODE if piece._color == 'BLACK' else 0)
+    return board.reshape(8, 8)
+
+
+def stack_games(games):
+    """Returns the (N, 8, 8) boards and side-to-move vector (0 white, 1 black) of games"""
+    games = list(games)
+    boards = np.stack([to_array(game) for game in games]) if games else np.zeros((0, 8, 8), dtype=np.int8)
+    sides = np.array([SIDES[game.get_game_turn()] for game in games], dtype=np.int8)
+    return boards, sides
+
+
+def validate_moves(boards, sides, from_squares, to_squares, board_index=None):
+    """
+    Returns a boolean vector telling for each move whether it is valid for the
+    side to move. Squares are indices 0 to 63 from a1. Move i is checked on
+    board i, or on board board_index[i] when board_index is given, so many
+    moves can share one board.
+    """
+    flat = np.asarray(boards, dtype=np.int8).reshape(-1, 64)
+    sides = np.asarray(sides, dtype=np.int8)
+    from_squares = np.asarray(from_squares, dtype=np.int64)
+    to_squares = np.asarray(to_squares, dtype=np.int64)
+    index = np.arange(len(flat)) if board_index is None else np.asarray(board_index, dtype=np.int64)
+    if not from_squares.shape == to_squares.shape == index.shape:
+        raise ValueError('from_squares, to_squares and the boards they index must line up')
+    if len(from_squares) and (min(from_squares.min(), to_squares.min()) < 0 or
+                              max(from_squares.max(), to_squares.max()) > 63):
+        raise ValueError('squares must be indices 0 to 63')
+
+    # Squares are looked up in the flattened batch, board offset plus square,
+    # with an always empty cell after every board for the padding of BETWEEN
+    cells = np.zeros((len(flat), 65), dtype=np.int8)
+    cells[:, :64] = flat
+    cells = cells.ravel()
+    small = np.int32 if cells.size < 1 << 31 else np.int64
+    offset = index.astype(small) * 65
+    from_squares, to_squares = from_squares.astype(small), to_squares.astype(small)
+    pair = from_squares << 6 | to_squares
+
+    piece = cells[offset + from_squares]
+    target = cells[offset + to_squares]
+    allowed = MOVE_RULES[piece.astype(small) << 16 | pair << 4 | target]
+    allowed &= (piece >> 3) == sides[index]
+
+    # Only moves that pass over squares need them empty, sliding moves and pawn double steps
+    passing = np.flatnonzero(allowed & HAS_BETWEEN[pair])
+    passed = cells[offset[passing, None] + BETWEEN[pair[passing]]]
+    allowed[passing[passed.view(np.int64).ravel() != 0]] = False
+    return allowed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time batch move validation against is_valid_move')
+    parser.add_argument('--positions', type=int, default=1000, help='random positions to validate on')
+    parser.add_argument('--moves', type=int, default=100, help='random candidate moves per position')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    games = []
+    for _ in range(args.positions):
+        game = ChessVar()
+        for _ in range(rng.randint(0, 60)):
+            moves = list(game.legal_moves())
+            if not moves:
+                break
+            game.make_move(*rng.choice(moves))
+        games.append(game)
+
+    boards, sides = stack_games(games)
+    # Candidate moves start on a square of the side to move, as a move generator's would
+    board_index = np.repeat(np.arange(len(games)), args.moves)
+    own_squares = [[square for square, piece in enumerate(game._chess_board)
+                    if piece is not None and piece._color == game.get_game_turn()] for game in games]
+    from_squares = np.array([rng.choice(own_squares[game]) for game in board_index.tolist()])
+    to_squares = np.array([rng.randrange(64) for _ in board_index])
+
+    start = time.perf_counter()
+    batch = validate_moves(boards, sides, from_squares, to_squares, board_index)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [games[game].is_valid_move(SQUARE_NAMES[from_square], SQUARE_NAMES[to_square])
+              for game, from_square, to_square in zip(board_index.tolist(), from_squares.tolist(),
+                                                      to_squares.tolist())]
+    single_seconds = time.perf_counter() - start
+
+    mismatches = int(np.count_nonzero(batch != np.array(single, dtype=bool)))
+    print(f'{len(board_index)} moves: batch {len(board_index) / batch_seconds:,.0f} moves/s, '
+          f'one at a time {len(board_index) / single_seconds:,.0f} moves/s, '
+          f'{single_seconds / batch_seconds:.1f}x, {mismatches} mismatches')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Benchmark suite for ChessVar, from single calls such as each piece's
+allowable_move up to make_move throughput over whole games, plus the main
+paths of every board backend side by side. Results are
+nanoseconds per operation, the best of several repeats, and can be saved
+as a JSON baseline and compared with a later run to catch regressions.
+
+    python benchmarks.py run --output benchmarks/baseline.json
+    python benchmarks.py compare benchmarks/baseline.json --threshold 0.10
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import time
+
+from Modified_chess import ChessVar, PIECES, SQUARE_INDEX, SQUARE_NAMES, parse_move
+from bitboard import BACKENDS
+from perft import perft
+from replay import read_games
+
+DEFAULT_THRESHOLD = 0.10
+TARGET_SECONDS = 0.05  # Rough length of one repeat
+CENTER = SQUARE_INDEX['d4']
+PERFT_DEPTH = 3
+
+
+def random_games(count, max_plies=120, seed=0):
+    """Returns count reproducible random games as lists of (move_from, move_to)"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = ChessVar()
+        moves = []
+        while game.is_game_ongoing() and len(moves) < max_plies:
+            move = rng.choice(list(game.legal_moves()))
+            game.make_move(*move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def crowded_board():
+    """Returns a middle game board, with the d4 square cleared for the piece under test"""
+    game = ChessVar()
+    for move in ('e2e4', 'e7e5', 'd2d3', 'd7d6', 'g1f3', 'b8c6', 'c1e3', 'c8g4', 'b1c3', 'g8f6'):
+        game.make_move(*parse_move(move))
+    board = list(game._chess_board)
+    board[CENTER] = None
+    return board
+
+
+def allowable_move_benchmark(piece_type, crowded):
+    """Times the white piece_type on d4 checking a move to every square"""
+    piece = PIECES['WHITE'][piece_type]
+    board = crowded_board() if crowded else [None] * 64
+    board[CENTER] = piece
+    allowable_move = piece.allowable_move
+    targets = range(64)
+
+    def run():
+        for target in targets:
+            allowable_move(CENTER, target, board)
+    return run, len(targets)
+
+
+def make_move_benchmark(games, backend=ChessVar):
+    """Times make_move replaying every recorded game from the start"""
+    total = sum(len(moves) for moves in games)
+
+    def run():
+        for moves in games:
+            game = backend()
+            for move_from, move_to in moves:
+                game.make_move(move_from, move_to)
+    return run, total
+
+
+def is_valid_move_benchmark(game):
+    """Times is_valid_move from every square holding a piece of the player to move to every square"""
+    board = game._chess_board
+    moves = [(SQUARE_NAMES[move_from], SQUARE_NAMES[move_to]) for move_from in range(64)
+             if board[move_from] is not None and board[move_from]._color == game.get_game_turn()
+             for move_to in range(64)]
+    is_valid_move = game.is_valid_move
+
+    def run():
+        for move_from, move_to in moves:
+            is_valid_move(move_from, move_to)
+    return run, len(moves)
+
+
+def backend_benchmarks(name, backend, games):
+    """Returns the benchmarks of one board backend, named backend_<name>_<benchmark>"""
+    start_game = backend()
+    middle_game = backend()
+    for move_from, move_to in games[0][:20]:
+        middle_game.make_move(move_from, move_to)
+    nodes = perft(backend(), PERFT_DEPTH)
+
+    return {
+        f'backend_{name}_construct': lambda: (backend, 1),
+        f'backend_{name}_legal_moves': lambda: ((lambda: list(middle_game.legal_moves())), 1),
+        f'backend_{name}_is_valid_move': lambda: is_valid_move_benchmark(middle_game),
+        f'backend_{name}_make_move_games': lambda: make_move_benchmark(games, backend),
+        f'backend_{name}_perft_{PERFT_DEPTH}': lambda: ((lambda: perft(start_game, PERFT_DEPTH)), nodes),
+    }
+
+
+def build_benchmarks(games):
+    """Returns a dict of benchmark name to a function giving (callable, operations per call)"""
+    start_game = ChessVar()
+    middle_game = ChessVar()
+    for move_from, move_to in games[0][:20]:
+        middle_game.make_move(move_from, move_to)
+    output = io.StringIO()
+
+    def print_board():
+        output.seek(0)
+        middle_game.print_chessboard(file=output)
+
+    benchmarks = {
+        'construct': lambda: (ChessVar, 1),
+        'starting_board_layout': lambda: (start_game.starting_board_layout, 1),
+        'get_game_state': lambda: (middle_game.get_game_state, 1),
+        'print_chessboard': lambda: (print_board, 1),
+        'render': lambda: (middle_game.render, 1),
+        'legal_moves': lambda: ((lambda: list(middle_game.legal_moves())), 1),
+        'make_move_games': lambda: make_move_benchmark(games),
+    }
+    for piece_type in PIECES['WHITE']:
+        for crowded in (False, True):
+            name = f"allowable_move_{piece_type.lower()}_{'crowded' if crowded else 'empty'}"
+            benchmarks[name] = (lambda piece_type=piece_type, crowded=crowded:
+                                allowable_move_benchmark(piece_type, crowded))
+    for name, backend in sorted(BACKENDS.items()):
+        benchmarks.update(backend_benchmarks(name, backend, games))
+    return benchmarks
+
+
+def time_benchmark(setup, repeat):
+    """Returns the best nanoseconds per operation over repeat timed runs"""
+    run, operations = setup()
+    start = time.perf_counter()
+    run()
+    single = time.perf_counter() - start
+    number = max(1, int(TARGET_SECONDS / single)) if single else 1000
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number / operations * 1e9
+
+
+def run_benchmarks(names=None, repeat=5, games=None):
+    """
+    Runs the benchmarks whose name contains any of names (all by default) and
+    returns the results as a dict ready to be saved as JSON
+    """
+    benchmarks = build_benchmarks(games or random_games(20))
+    results = {}
+    for name, setup in benchmarks.items():
+        if names and not any(wanted in name for wanted in names):
+            continue
+        results[name] = {'ns_per_op': round(time_benchmark(setup, repeat), 1)}
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'benchmarks': results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns (name, baseline ns, current ns, ratio, regressed) for every
+    benchmark in both runs. A benchmark regressed when it got slower by more
+    than threshold, a fraction of the baseline time.
+    """
+    rows = []
+    for name, result in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        before = baseline['benchmarks'][name]['ns_per_op']
+        after = result['ns_per_op']
+        ratio = after / before
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ChessVar and compare against a baseline')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', help='save the results as JSON here')
+    compare_parser = commands.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline', help='JSON results to compare against')
+    compare_parser.add_argument('current', nargs='?', help='JSON results to check (default: run now)')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='slowdown, as a fraction, counted as a regression (default 0.10)')
+    for command_parser in (run_parser, compare_parser):
+        command_parser.add_argument('--filter', nargs='*', metavar='NAME', help='only benchmarks containing NAME')
+        command_parser.add_argument('--repeat', type=int, default=5)
+        command_parser.add_argument('--games', help='recorded games to replay (default: 20 random games)')
+    args = parser.parse_args(argv)
+
+    games = None
+    if args.games:
+        games = [[parse_move(move) if isinstance(move, str) else tuple(move) for move in moves]
+                 for _, moves in read_games(args.games) if moves is not None]
+
+    if args.command == 'run':
+        results = run_benchmarks(args.filter, args.repeat, games)
+        for name, result in results['benchmarks'].items():
+            print(f"{name:36s} {result['ns_per_op']:12,.0f} ns/op")
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+                file.write('\n')
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if args.current:
+        with open(args.current) as file:
+            current = json.load(file)
+    else:
+        current = run_benchmarks(args.filter, args.repeat, games)
+
+    regressions = 0
+    for name, before, after, ratio, regressed in compare(baseline, current, args.threshold):
+        regressions += regressed
+        print(f"{name:36s} {before:12,.0f} -> {after:12,.0f} ns/op  {ratio - 1:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    print(f'{regressions} regression(s) beyond {args.threshold:.0%}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
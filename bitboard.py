@@ -0,0 +1,343 @@
+"""
+Bitboard backend for ChessVar. The board is kept as twelve 64-bit integers,
+one per color and piece type, plus an occupancy mask per color. Sliding
+attacks are read from per-line tables keyed by the blockers on the line,
+so move validation and generation are a handful of integer operations and
+lookups.
+
+The square list board is still kept and updated on every move, so playing
+moves costs more than on the default backend. Measured against it over the
+same random games (benchmarks.py, the backend_* entries), move generation
+is about 20% faster, perft about 15%, is_valid_move about 40%, legal_moves
+only about 5% as naming the squares dominates, construction is even, and
+make_move is about 25% slower. Pick it where moves are generated or checked
+far more often than they are played.
+"""
+
+from Modified_chess import ChessVar, PIECES, KNIGHT_MOVES, KING_MOVES, PAWN_CAPTURES, QUEEN_RAYS, ray_table
+
+PIECE_TYPES = ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+PIECE_INDEX = {piece_type: index for index, piece_type in enumerate(PIECE_TYPES)}
+COLORS = ('WHITE', 'BLACK')
+COLOR_INDEX = {'WHITE': 0, 'BLACK': 1}
+
+# Shared piece object -> (bitboard index, color index)
+PIECE_SLOTS = {piece: (COLOR_INDEX[color] * 6 + PIECE_INDEX[piece_type], COLOR_INDEX[color])
+               for color, pieces in PIECES.items() for piece_type, piece in pieces.items()}
+
+BOARD_MASK = (1 << 64) - 1
+
+
+def square_mask(squares):
+    """Returns the bitboard with a bit set for each square index"""
+    mask = 0
+    for square in squares:
+        mask |= 1 << square
+    return mask
+
+
+def line_table(directions):
+    """
+    Builds, for every square, the (blocker mask, attacks) pair of the line
+    through it along two opposite directions. The blocker mask leaves out the
+    last square of each ray, which stops the piece whether it is occupied or
+    not, and attacks maps every subset of it to the squares reached.
+    """
+    rays_by_direction = [ray_table((direction,)) for direction in directions]
+    table = []
+    for square in range(64):
+        rays = [ray for rays in rays_by_direction for ray in rays[square]]
+        inner = square_mask(target for ray in rays for target in ray[:-1])
+        attacks = {}
+        blockers = 0
+        while True:
+            reached = 0
+            for ray in rays:
+                for target in ray:
+                    reached |= 1 << target
+                    if blockers >> target & 1:
+                        break
+            attacks[blockers] = reached
+            # Next subset of inner, back to 0 once they have all been seen
+            blockers = (blockers - inner) & inner
+            if not blockers:
+                break
+        table.append((inner, attacks))
+    return tuple(table)
+
+
+def between_table():
+    """
+    Builds the bitboard of the squares strictly between every pair of squares
+    on a shared line, indexed by from_square * 64 + to_square. Pairs that do
+    not share a line have nothing between them.
+    """
+    table = [0] * 4096
+    for square in range(64):
+        for ray in QUEEN_RAYS[square]:
+            passed = 0
+            for target in ray:
+                table[square << 6 | target] = passed
+                passed |= 1 << target
+    return tuple(table)
+
+
+# Attack lookups built once at import
+KNIGHT_ATTACKS = tuple(square_mask(targets) for targets in KNIGHT_MOVES)
+KING_ATTACKS = tuple(square_mask(targets) for targets in KING_MOVES)
+PAWN_ATTACKS = (tuple(square_mask(targets) for targets in PAWN_CAPTURES['WHITE']),
+                tuple(square_mask(targets) for targets in PAWN_CAPTURES['BLACK']))
+
+# Per square, one (blocker mask, attacks) pair per line a slider moves along
+STRAIGHT_LINES = tuple(zip(line_table(((1, 0), (-1, 0))), line_table(((0, 1), (0, -1)))))
+DIAGONAL_LINES = tuple(zip(line_table(((1, 1), (-1, -1))), line_table(((1, -1), (-1, 1)))))
+QUEEN_LINES = tuple(straight + diagonal for straight, diagonal in zip(STRAIGHT_LINES, DIAGONAL_LINES))
+SLIDING_LINES = {'Bishop': DIAGONAL_LINES, 'Rook': STRAIGHT_LINES, 'Queen': QUEEN_LINES}
+
+BETWEEN = between_table()
+
+# (bitboard index offset, jump attacks or sliding lines) for every piece type but pawns, in PIECE_TYPES order
+PIECE_ATTACKS = ((1, KNIGHT_ATTACKS, None), (2, None, DIAGONAL_LINES), (3, None, STRAIGHT_LINES),
+                 (4, None, QUEEN_LINES), (5, KING_ATTACKS, None))
+
+# Rank masks used for the pawn double step
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+
+
+def sliding_attacks(square, occupied, lines):
+    """
+    Returns the squares reached from square along the given lines, stopping
+    at (and including) the first occupied square in each direction
+    """
+    attacks = 0
+    for inner, table in lines[square]:
+        attacks |= table[occupied & inner]
+    return attacks
+
+
+# Squares each non-pawn piece reaches on an empty board, see BETWEEN for what lies in the way
+REACH = {'Knight': KNIGHT_ATTACKS, 'King': KING_ATTACKS}
+REACH.update((piece_type, tuple(sliding_attacks(square, 0, lines) for square in range(64)))
+             for piece_type, lines in SLIDING_LINES.items())
+
+
+def pawn_push_table(step, start_row):
+    """Builds, for every square, the pushes of a pawn on an empty board, double step included"""
+    table = []
+    for square in range(64):
+        single = square + step
+        if not 0 <= single < 64:
+            table.append(0)
+        elif square >> 3 == start_row:
+            table.append(square_mask((single, single + step)))
+        else:
+            table.append(square_mask((single,)))
+    return tuple(table)
+
+
+def piece_moves_table():
+    """
+    Builds the lookups _is_valid_move needs for every shared piece object:
+    the squares it reaches on an empty board, its color index and, for
+    pawns, the squares it captures on
+    """
+    pushes = (pawn_push_table(8, 1), pawn_push_table(-8, 6))
+    table = {}
+    for piece, (_, color) in PIECE_SLOTS.items():
+        if piece._piece_type == 'Pawn':
+            reach = tuple(push | capture for push, capture in zip(pushes[color], PAWN_ATTACKS[color]))
+            table[piece] = (reach, color, PAWN_ATTACKS[color])
+        else:
+            table[piece] = (REACH[piece._piece_type], color, None)
+    return table
+
+
+PIECE_MOVES = piece_moves_table()
+
+
+def iterate_bits(mask):
+    """Generates the square index of every set bit, lowest first"""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def board_bitboards(board):
+    """Returns the twelve piece bitboards and the two occupancy masks of a square list board"""
+    bitboards = [0] * 12
+    occupancy = [0, 0]
+    for square, piece in enumerate(board):
+        if piece is not None:
+            index, color = PIECE_SLOTS[piece]
+            bitboards[index] |= 1 << square
+            occupancy[color] |= 1 << square
+    return bitboards, occupancy
+
+
+# Every game starts from the same bitboards, copied rather than rebuilt
+START_BITBOARDS, START_OCCUPANCY = board_bitboards(ChessVar().starting_board_layout())
+
+
+class BitboardChessVar(ChessVar):
+    """
+    ChessVar that validates and generates moves from bitboards. The square
+    list board is still kept so printing and piece lookups by square keep
+    working, and both are updated together through _set_square.
+    """
+
+    def __init__(self, **draw_rules):
+        """Builds the bitboards from the starting board layout"""
+        super().__init__(**draw_rules)
+        self._bitboards = list(START_BITBOARDS)
+        self._occupancy = list(START_OCCUPANCY)
+
+    def _set_square(self, square, piece):
+        """Keeps the bitboards in step with every change to the board"""
+        bit = 1 << square
+        bitboards, occupancy = self._bitboards, self._occupancy
+        previous = self._chess_board[square]
+        if previous is not None:
+            index, color = PIECE_SLOTS[previous]
+            bitboards[index] ^= bit
+            occupancy[color] ^= bit
+        if piece is not None:
+            index, color = PIECE_SLOTS[piece]
+            bitboards[index] |= bit
+            occupancy[color] |= bit
+        ChessVar._set_square(self, square, piece)
+
+    def fork(self):
+        """Forks the game, the bitboards are a few integers and are copied outright"""
+        child = super().fork()
+        child._bitboards = list(self._bitboards)
+        child._occupancy = list(self._occupancy)
+        return child
+
+    def get_bitboard(self, color, piece_type):
+        """Returns the bitboard of color's pieces of piece_type"""
+        return self._bitboards[COLOR_INDEX[color] * 6 + PIECE_INDEX[piece_type]]
+
+    def get_occupancy(self, color=None):
+        """Returns the occupied squares of color, or of both sides when color is None"""
+        if color is None:
+            return self._occupancy[0] | self._occupancy[1]
+        return self._occupancy[COLOR_INDEX[color]]
+
+    def _is_valid_move(self, from_square, to_square):
+        piece = self._chess_board[from_square]
+        if not piece or piece._color != self._game_turn:
+            return False
+
+        reach, color, captures = PIECE_MOVES[piece]
+        if not reach[from_square] >> to_square & 1:
+            return False
+
+        occupancy = self._occupancy
+        occupied = occupancy[0] | occupancy[1]
+        if captures is not None:
+            # Pawns capture diagonally and push straight onto empty squares
+            if captures[from_square] >> to_square & 1:
+                return bool(occupancy[1 - color] >> to_square & 1)
+            if occupied >> to_square & 1:
+                return False
+        elif occupancy[color] >> to_square & 1:
+            return False
+        return not BETWEEN[from_square << 6 | to_square] & occupied
+
+    def _move_targets(self, square, piece):
+        """Returns the bitboard of squares the piece on square can move to"""
+        color = PIECE_SLOTS[piece][1]
+        own = self._occupancy[color]
+        enemy = self._occupancy[1 - color]
+        piece_type = piece._piece_type
+
+        if piece_type == 'Pawn':
+            empty = ~(own | enemy)
+            if color == 0:
+                single = (1 << square << 8) & empty
+                double = ((single & RANK_3) << 8) & empty
+            else:
+                single = (1 << square >> 8) & empty
+                double = ((single & RANK_6) >> 8) & empty
+            # Bits pushed past h8 fall outside the board, mask them off
+            return (single | double | (PAWN_ATTACKS[color][square] & enemy)) & BOARD_MASK
+
+        if piece_type == 'Knight':
+            targets = KNIGHT_ATTACKS[square]
+        elif piece_type == 'King':
+            targets = KING_ATTACKS[square]
+        else:
+            targets = sliding_attacks(square, own | enemy, SLIDING_LINES[piece_type])
+
+        return targets & ~own
+
+    def _piece_moves(self, square):
+        piece = self._chess_board[square]
+        if piece is None:
+            return iter(())
+        return iterate_bits(self._move_targets(square, piece))
+
+    def _generate_moves(self, color):
+        color = COLOR_INDEX[color]
+        bitboards = self._bitboards
+        own = self._occupancy[color]
+        enemy = self._occupancy[1 - color]
+        occupied = own | enemy
+        empty = ~occupied & BOARD_MASK
+        base = color * 6
+
+        # Pawn pushes are found for every pawn at once, shifting the pawn bitboard
+        pawns = bitboards[base]
+        if color == 0:
+            singles = (pawns << 8) & empty
+            doubles = ((singles & RANK_3) << 8) & empty
+            step = 8
+        else:
+            singles = (pawns >> 8) & empty
+            doubles = ((singles & RANK_6) >> 8) & empty
+            step = -8
+        while singles:
+            lowest = singles & -singles
+            singles ^= lowest
+            move_to = lowest.bit_length() - 1
+            yield move_to - step, move_to
+        while doubles:
+            lowest = doubles & -doubles
+            doubles ^= lowest
+            move_to = lowest.bit_length() - 1
+            yield move_to - 2 * step, move_to
+        pawn_attacks = PAWN_ATTACKS[color]
+        while pawns:
+            lowest = pawns & -pawns
+            pawns ^= lowest
+            square = lowest.bit_length() - 1
+            targets = pawn_attacks[square] & enemy
+            while targets:
+                lowest = targets & -targets
+                targets ^= lowest
+                yield square, lowest.bit_length() - 1
+
+        not_own = ~own
+        for offset, jumps, lines in PIECE_ATTACKS:
+            pieces = bitboards[base + offset]
+            while pieces:
+                lowest = pieces & -pieces
+                pieces ^= lowest
+                square = lowest.bit_length() - 1
+                if jumps is not None:
+                    targets = jumps[square] & not_own
+                else:
+                    targets = 0
+                    for inner, table in lines[square]:
+                        targets |= table[occupied & inner]
+                    targets &= not_own
+                while targets:
+                    lowest = targets & -targets
+                    targets ^= lowest
+                    yield square, lowest.bit_length() - 1
+
+
+# Board backends that can be picked when creating a game
+BACKENDS = {'board': ChessVar, 'bitboard': BitboardChessVar}
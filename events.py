@@ -0,0 +1,106 @@
+"""
+Events sent by ChessVar.make_move to the callables passed to
+ChessVar.subscribe, so watchers react to each change instead of polling the
+game. Every event carries the game it happened in and the ply it happened at.
+
+EventQueue collects events without ever blocking the game, dropping the
+oldest when full, and AsyncEventStream hands them to asyncio code as an
+async iterator:
+
+    stream = AsyncEventStream()
+    game.subscribe(stream)
+    async for event in stream:
+        ...
+"""
+
+from collections import deque, namedtuple
+
+# A piece moved from move_from to move_to, both in algebraic notation
+MoveMade = namedtuple('MoveMade', 'game move_from move_to color piece_type ply')
+
+# The move captured color's piece_type on square. captured_counts is a copy of
+# the game's captured counts after the capture, {color: {piece_type: count}}.
+PieceCaptured = namedtuple('PieceCaptured', 'game square color piece_type captured_counts ply')
+
+# The game ended in state, WHITE_WON, BLACK_WON or DRAW
+GameEnded = namedtuple('GameEnded', 'game state ply')
+
+DEFAULT_MAX_EVENTS = 1024
+
+
+class EventQueue:
+    """
+    Bounded subscriber that stores events for the watcher to collect. It never
+    blocks the game: when full, the oldest event is dropped and counted.
+    """
+
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        """Initializing an empty queue"""
+        self._events = deque(maxlen=max_events)
+        self.dropped = 0
+
+    def __call__(self, event):
+        """Stores event, dropping the oldest one when the queue is full"""
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    def __len__(self):
+        """Returns the number of events waiting"""
+        return len(self._events)
+
+    def get(self):
+        """Returns the oldest waiting event, or None when there is none"""
+        return self._events.popleft() if self._events else None
+
+    def drain(self):
+        """Returns every waiting event, oldest first, and empties the queue"""
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+
+class AsyncEventStream:
+    """
+    Bounded subscriber that can be read with async for. Events must be sent
+    from the thread running the event loop, as they are when games are played
+    by asyncio handlers. When the reader falls behind, the oldest event is
+    dropped and counted rather than holding up the game.
+    """
+
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        """Initializing an empty stream"""
+        # Imported here, Modified_chess imports this module and most games never need asyncio
+        import asyncio
+
+        self._queue = asyncio.Queue(max_events)
+        self._closed = False
+        self.dropped = 0
+
+    def __call__(self, event):
+        """Queues event, dropping the oldest one when the stream is full"""
+        if self._closed:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    def close(self):
+        """Ends the iteration once the events already queued have been read"""
+        if not self._closed:
+            self._closed = True
+            if self._queue.full():
+                self._queue.get_nowait()
+                self.dropped += 1
+            self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Waits for and returns the next event"""
+        event = await self._queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
@@ -0,0 +1,198 @@
+"""
+Opt-in timing of the move validation hot path. enable() wraps make_move,
+is_valid_move, move validation of every backend, each piece's
+allowable_move, capture_piece and get_game_state with counting timers, and
+disable() puts the original methods back, so nothing is paid while it is
+off. stats() returns a JSON-ready snapshot that can be exported from a live
+process at any time:
+
+    import instrumentation
+    instrumentation.enable()
+    ...
+    print(json.dumps(instrumentation.stats()))
+
+Times are inclusive, so make_move's time contains the validation and capture
+it triggers. Percentiles come from the most recent SAMPLE_SIZE calls of each
+function.
+
+    python instrumentation.py --games 200
+"""
+
+import argparse
+import functools
+import json
+import random
+import time
+from collections import deque
+
+from Modified_chess import ChessVar, SQUARE_NAMES, Pawn, Knight, Bishop, Rook, Queen, King
+from bitboard import BACKENDS
+
+SAMPLE_SIZE = 4096
+PERCENTILES = (50, 90, 99)
+
+# (class, method name, stats name) for every method that is timed
+TIMED_METHODS = ([(ChessVar, 'make_move', 'make_move'),
+                  (ChessVar, 'is_valid_move', 'is_valid_move'),
+                  (ChessVar, 'capture_piece', 'capture_piece'),
+                  (ChessVar, 'get_game_state', 'get_game_state')] +
+                 [(piece_class, 'allowable_move', piece_class.__name__ + '.allowable_move')
+                  for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)])
+
+# Validation is also where moves are accepted or rejected per piece type
+VALIDATION_METHODS = [(backend, '_is_valid_move', name + '._is_valid_move')
+                      for name, backend in sorted(BACKENDS.items())]
+
+
+class TimingRecord:
+    """Call count, total time and recent samples of one function"""
+
+    __slots__ = ('calls', 'total_ns', 'samples')
+
+    def __init__(self):
+        """Initializing an empty record"""
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.clear()
+
+    def clear(self):
+        """Forgets every call recorded"""
+        self.calls = 0
+        self.total_ns = 0
+        self.samples.clear()
+
+    def add(self, elapsed_ns):
+        """Records one call that took elapsed_ns"""
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        self.samples.append(elapsed_ns)
+
+    def snapshot(self):
+        """Returns the record as a dict, times in microseconds"""
+        ordered = sorted(self.samples)
+        snapshot = {'calls': self.calls, 'total_us': self.total_ns / 1000,
+                    'mean_us': self.total_ns / self.calls / 1000 if self.calls else 0.0}
+        for percentile in PERCENTILES:
+            value = ordered[min(len(ordered) - 1, len(ordered) * percentile // 100)] if ordered else 0
+            snapshot[f'p{percentile}_us'] = value / 1000
+        return snapshot
+
+
+_records = {}  # stats name -> TimingRecord
+_validation = {}  # piece type -> [accepted, rejected]
+_originals = []  # (class, method name, original function) while enabled
+
+
+def timed(function, record):
+    """Returns function wrapped to add the time of every call to record"""
+    clock = time.perf_counter_ns
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record.add(clock() - start)
+    return wrapper
+
+
+def timed_validation(function, record):
+    """Returns a _is_valid_move wrapped to time it and count its answers per piece type"""
+    clock = time.perf_counter_ns
+
+    @functools.wraps(function)
+    def wrapper(self, from_square, to_square):
+        start = clock()
+        valid = function(self, from_square, to_square)
+        record.add(clock() - start)
+
+        piece = self._chess_board[from_square]
+        counts = _validation.setdefault(piece._piece_type if piece else 'empty', [0, 0])
+        counts[0 if valid else 1] += 1
+        return valid
+    return wrapper
+
+
+def is_enabled():
+    """Returns True while the methods are wrapped"""
+    return bool(_originals)
+
+
+def enable():
+    """Wraps the hot path methods with timers, does nothing if already enabled"""
+    if _originals:
+        return
+    for targets, wrap in ((TIMED_METHODS, timed), (VALIDATION_METHODS, timed_validation)):
+        for owner, method_name, stats_name in targets:
+            original = owner.__dict__[method_name]
+            record = _records.setdefault(stats_name, TimingRecord())
+            _originals.append((owner, method_name, original))
+            setattr(owner, method_name, wrap(original, record))
+
+
+def disable():
+    """Puts the original methods back, the numbers gathered so far are kept"""
+    while _originals:
+        owner, method_name, original = _originals.pop()
+        setattr(owner, method_name, original)
+
+
+def reset():
+    """Forgets all numbers gathered so far"""
+    # Records are cleared in place since enabled wrappers hold on to them
+    for record in _records.values():
+        record.clear()
+    _validation.clear()
+
+
+def stats():
+    """
+    Returns a snapshot of the numbers gathered: 'timings' maps each function
+    to its calls, total, mean and percentile times in microseconds, and
+    'validation' maps each piece type to its accepted and rejected moves
+    """
+    validation = {}
+    for piece_type, (accepted, rejected) in sorted(_validation.items()):
+        validation[piece_type] = {'accepted': accepted, 'rejected': rejected,
+                                  'accept_ratio': accepted / (accepted + rejected)}
+    return {'enabled': is_enabled(),
+            'timings': {name: record.snapshot() for name, record in sorted(_records.items()) if record.calls},
+            'validation': validation}
+
+
+class instrumented:
+    """Context manager that enables instrumentation for a block and disables it after"""
+
+    def __enter__(self):
+        enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        disable()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the ChessVar move validation hot path')
+    parser.add_argument('--games', type=int, default=100, help='random games to play')
+    parser.add_argument('--tries', type=int, default=8, help='random moves tried for each legal move made')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='board')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Random moves give validation a realistic mix of accepted and rejected tries
+    rng = random.Random(args.seed)
+    with instrumented():
+        for _ in range(args.games):
+            game = BACKENDS[args.backend]()
+            while game.get_game_state() == 'UNFINISHED':
+                for _ in range(args.tries):
+                    game.is_valid_move(rng.choice(SQUARE_NAMES), rng.choice(SQUARE_NAMES))
+                moves = list(game.legal_moves())
+                if not moves:
+                    break
+                game.make_move(*rng.choice(moves))
+    print(json.dumps(stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
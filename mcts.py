@@ -0,0 +1,244 @@
+"""
+Monte Carlo tree search (UCT) for ChessVar. Each playout walks the tree by
+the UCT rule, adds one node and plays random moves from there to a result,
+or to a ply cap for games that never resolve, which count as half a win.
+Playouts take any winning capture they see and otherwise move at random.
+They run on a fork of the game through execute_move, with no validation,
+notation or undo records.
+
+The tree is kept between moves: call advance for every move played and the
+subtree under it becomes the new root.
+
+    python mcts.py --time-ms 1000
+    python mcts.py --playouts 2000 --moves 10
+"""
+
+import argparse
+import math
+import random
+import time
+from collections import namedtuple
+
+from Modified_chess import ChessVar, SQUARE_NAMES, SQUARE_INDEX
+
+MCTSResult = namedtuple('MCTSResult', 'move visits value playouts elapsed_ms playouts_per_second')
+
+DEFAULT_EXPLORATION = 1.4
+DEFAULT_PLAYOUT_PLIES = 100
+
+
+class MCTSNode:
+    """
+    One position in the tree, reached by move. wins counts playout results
+    for the player who made the move, a drawn or capped playout adding half,
+    and decisive is set when the move itself wins the game, not when it
+    draws it.
+    """
+
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins', 'mover', 'decisive')
+
+    def __init__(self, move, parent, mover):
+        """Initializing a node nobody has visited yet"""
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None  # Moves not yet added as children, filled on the first visit
+        self.visits = 0
+        self.wins = 0.0
+        self.mover = mover
+        self.decisive = False
+
+    def best_child(self, exploration):
+        """Returns the child with the highest UCT value"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTS:
+    """
+    Searches the positions following a game with UCT. The search works on its
+    own fork of the game, so the game passed in is never touched.
+    """
+
+    def __init__(self, game, exploration=DEFAULT_EXPLORATION, playout_plies=DEFAULT_PLAYOUT_PLIES, seed=None):
+        """Initializing an empty tree at the game's position"""
+        self._game = game.fork()
+        self._exploration = exploration
+        self._playout_plies = playout_plies
+        self._rng = random.Random(seed)
+        self._root = MCTSNode(None, None, None)
+
+    def search(self, time_budget_ms=None, playouts=None):
+        """
+        Runs playouts until time_budget_ms runs out or playouts are done,
+        whichever comes first, and returns an MCTSResult with the most visited
+        move, its visits, its win rate for the player to move and the rate of
+        playouts. The tree from earlier searches is built on.
+        """
+        if time_budget_ms is None and playouts is None:
+            raise ValueError('search needs a time budget, a number of playouts or both')
+
+        start = time.perf_counter()
+        deadline = start + time_budget_ms / 1000 if time_budget_ms is not None else None
+        done = 0
+        while (playouts is None or done < playouts) and (deadline is None or time.perf_counter() < deadline):
+            self.playout()
+            done += 1
+
+        elapsed = time.perf_counter() - start
+        if not self._root.children:
+            return MCTSResult(None, 0, 0.0, done, elapsed * 1000, done / elapsed if elapsed else 0.0)
+
+        # A move that wins on the spot beats any visit count
+        best = max(self._root.children, key=lambda child: (child.decisive, child.visits))
+        move = SQUARE_NAMES[best.move[0]], SQUARE_NAMES[best.move[1]]
+        return MCTSResult(move, best.visits, best.wins / best.visits, done, elapsed * 1000,
+                          done / elapsed if elapsed else 0.0)
+
+    def playout(self):
+        """Selects a leaf, expands it, plays it out and backs the result up"""
+        game = self._game
+        node = self._root
+        pushed = 0
+        try:
+            # Walk down fully expanded nodes, then add one untried move
+            while True:
+                if not game.is_game_ongoing():
+                    break
+                if node.untried is None:
+                    node.untried = self.expansion_order(game)
+                if node.untried:
+                    move = node.untried.pop()
+                    child = MCTSNode(move, node, game._game_turn)
+                    node.children.append(child)
+                    game._push(*move)
+                    pushed += 1
+                    child.decisive = game.get_game_state() == child.mover + '_WON'  # Not for a drawing move
+                    node = child
+                    break
+                if not node.children:
+                    break  # Nothing can move
+                node = node.best_child(self._exploration)
+                game._push(*node.move)
+                pushed += 1
+
+            winner = self.rollout(game)
+        finally:
+            for _ in range(pushed):
+                game.pop()
+
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.mover:
+                node.wins += 1
+            node = node.parent
+
+    def expansion_order(self, game):
+        """
+        Returns the moves of the position in the order they are popped for
+        expansion: shuffled, except that winning captures come first
+        """
+        moves = list(game._generate_moves(game._game_turn))
+        self._rng.shuffle(moves)
+        moves.sort(key=lambda move: game._wins_by_capture(move[1]))  # Stable, and popped from the end
+        return moves
+
+    def rollout(self, game):
+        """
+        Plays random moves on a fork of game until someone wins or the ply cap
+        is reached and returns the winning color, or None. The ply cap stands
+        in for the draw rules, which playouts skip along with the undo records.
+        """
+        state = game.get_game_state()
+        if state != 'UNFINISHED':
+            return {'WHITE_WON': 'WHITE', 'BLACK_WON': 'BLACK'}.get(state)  # None for a draw
+
+        rng = self._rng
+        playout = game.fork()
+        for _ in range(self._playout_plies):
+            moves = list(playout._generate_moves(playout._game_turn))
+            if not moves:
+                return None
+
+            # Take a winning capture when there is one
+            move = None
+            for candidate in moves:
+                if playout._wins_by_capture(candidate[1]):
+                    move = candidate
+                    break
+            if move is None:
+                move = moves[rng.randrange(len(moves))]
+
+            playout.execute_move(*move)
+            if not playout.is_game_ongoing():
+                return playout._game_turn
+            playout.switch_turn()
+        return None
+
+    def advance(self, move):
+        """
+        Plays move, a (move_from, move_to) pair, and keeps the subtree under it
+        as the new root. Raises ValueError if the move is illegal.
+        """
+        game = self._game
+        from_square, to_square = SQUARE_INDEX[move[0]], SQUARE_INDEX[move[1]]
+        if not game.is_game_ongoing() or not game._is_valid_move(from_square, to_square):
+            raise ValueError(f'illegal move {move[0]}{move[1]}')
+
+        for child in self._root.children:
+            if child.move == (from_square, to_square):
+                self._root = child
+                break
+        else:
+            self._root = MCTSNode(None, None, None)
+        self._root.parent = None
+        game._push(from_square, to_square)
+
+    def root_visits(self):
+        """Returns how many playouts went through the current root"""
+        return self._root.visits
+
+
+def mcts_move(game, time_budget_ms=None, playouts=None, seed=None):
+    """Searches game with a fresh tree and returns an MCTSResult"""
+    return MCTS(game, seed=seed).search(time_budget_ms, playouts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pick ChessVar moves with Monte Carlo tree search')
+    parser.add_argument('--position', help='position text as written by ChessVar.to_text (default: start)')
+    parser.add_argument('--time-ms', type=float, default=None, help='time budget per move in milliseconds')
+    parser.add_argument('--playouts', type=int, default=None, help='playouts per move')
+    parser.add_argument('--moves', type=int, default=1, help='moves to play, reusing the tree between them')
+    parser.add_argument('--playout-plies', type=int, default=DEFAULT_PLAYOUT_PLIES)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.time_ms is None and args.playouts is None:
+        parser.error('give --time-ms, --playouts or both')
+    try:
+        game = ChessVar.from_text(args.position) if args.position else ChessVar()
+    except ValueError as error:
+        parser.error(str(error))
+
+    tree = MCTS(game, playout_plies=args.playout_plies, seed=args.seed)
+    for _ in range(args.moves):
+        reused = tree.root_visits()
+        result = tree.search(args.time_ms, args.playouts)
+        if result.move is None:
+            break
+        print(f'{game.get_game_turn()} {result.move[0]}{result.move[1]}: {result.visits} visits, '
+              f'value {result.value:.2f}, {result.playouts} playouts ({reused} reused) '
+              f'in {result.elapsed_ms:.0f} ms, {result.playouts_per_second:,.0f} playouts/s')
+        game.make_move(*result.move)
+        tree.advance(result.move)
+        if not game.is_game_ongoing():
+            print(game.get_game_state())
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Opening book stored as a sorted binary file of (position key, move, weight,
+wins, losses) records. The reader memory-maps the file and binary-searches
+it in place, so any number of processes can share one book through the page
+cache and start using it without parsing anything.
+
+    python opening_book.py build games.jsonl book.bin --max-plies 16
+    python opening_book.py self-play book.bin --games 200
+    python opening_book.py probe book.bin --moves e2e4 e7e5
+"""
+
+import argparse
+import mmap
+import random
+import struct
+from collections import namedtuple
+
+from Modified_chess import ChessVar, SQUARE_NAMES, SQUARE_INDEX, parse_move
+from replay import read_games
+from search import search
+
+# File header: magic, record count, record size
+HEADER = struct.Struct('<8sII')
+MAGIC = b'CVBOOK1\0'
+
+# Record: Zobrist key, from square, to square, two pad bytes, weight, wins, losses
+RECORD = struct.Struct('<QBBxxIII')
+
+BookMove = namedtuple('BookMove', 'move weight wins losses')
+
+
+def game_entries(moves, max_plies):
+    """
+    Replays moves and returns the (key, from_square, to_square, mover) of each
+    of the first max_plies plies, with the final game state. Replay stops at
+    the first illegal move.
+    """
+    game = ChessVar()
+    entries = []
+    for move in moves:
+        try:
+            move_from, move_to = parse_move(move) if isinstance(move, str) else move
+            key, mover = game.get_zobrist_key(), game.get_game_turn()
+            if not game.make_move(move_from, move_to):
+                break
+        except (ValueError, KeyError, TypeError):
+            break
+        if len(entries) < max_plies:
+            entries.append((key, SQUARE_INDEX[move_from], SQUARE_INDEX[move_to], mover))
+    return entries, game.get_game_state()
+
+
+def build_book(games, path, max_plies=16, min_weight=1):
+    """
+    Writes the book for an iterable of move lists to path and returns the
+    number of records. Moves played fewer than min_weight times are left out.
+    """
+    stats = {}  # (key, from_square, to_square) -> [weight, wins, losses]
+    for moves in games:
+        entries, state = game_entries(moves, max_plies)
+        for key, from_square, to_square, mover in entries:
+            entry = stats.setdefault((key, from_square, to_square), [0, 0, 0])
+            entry[0] += 1
+            if state == mover + '_WON':
+                entry[1] += 1
+            elif state.endswith('_WON'):
+                entry[2] += 1
+
+    # Sorted by key, most played move first within a position
+    records = sorted(((key, from_square, to_square, weight, wins, losses)
+                      for (key, from_square, to_square), (weight, wins, losses) in stats.items()
+                      if weight >= min_weight),
+                     key=lambda record: (record[0], -record[3]))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(records), RECORD.size))
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return len(records)
+
+
+def self_play_games(count, max_plies=16, depth=2, randomness=0.3, seed=0):
+    """
+    Generates move lists of count games played against itself by the search,
+    with a random legal move instead of the search's choice randomness of the
+    time so the games spread out. Games are played out to a result or 200 plies.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        game = ChessVar()
+        moves = []
+        while game.is_game_ongoing() and len(moves) < 200:
+            if len(moves) < max_plies and rng.random() < randomness:
+                move = rng.choice(list(game.legal_moves()))
+            else:
+                move = search(game, depth=depth).move
+            if move is None:
+                break
+            game.make_move(*move)
+            moves.append(move)
+        yield moves
+
+
+class OpeningBook:
+    """
+    Read-only view of a book file through mmap. Lookups binary-search the
+    records in place, nothing is loaded up front.
+    """
+
+    def __init__(self, path):
+        """Maps the book file and checks its header"""
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            raise ValueError('not an opening book: ' + path)
+        magic, self._count, record_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size or len(self._map) < HEADER.size + self._count * RECORD.size:
+            raise ValueError('not an opening book: ' + path)
+
+    def __len__(self):
+        """Returns the number of records"""
+        return self._count
+
+    def close(self):
+        """Unmaps the file"""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _key_at(self, index):
+        """Returns the position key of record index"""
+        return struct.unpack_from('<Q', self._map, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key):
+        """Returns the BookMoves for the position key, most played first"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        moves = []
+        offset = HEADER.size + low * RECORD.size
+        for index in range(low, self._count):
+            record_key, from_square, to_square, weight, wins, losses = RECORD.unpack_from(self._map, offset)
+            if record_key != key:
+                break
+            moves.append(BookMove((SQUARE_NAMES[from_square], SQUARE_NAMES[to_square]), weight, wins, losses))
+            offset += RECORD.size
+        return moves
+
+    def moves_for(self, game):
+        """Returns the BookMoves for the game's current position"""
+        return self.lookup(game.get_zobrist_key())
+
+    def choose(self, game, rng=random):
+        """Picks a book move for game weighted by how often it was played, or None"""
+        moves = self.moves_for(game)
+        if not moves:
+            return None
+        return rng.choices([book_move.move for book_move in moves],
+                           [book_move.weight for book_move in moves])[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and probe ChessVar opening books')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='build a book from recorded games')
+    build_parser.add_argument('games', help='JSONL or text file with one game per line')
+    build_parser.add_argument('book', help='book file to write')
+    build_parser.add_argument('--max-plies', type=int, default=16)
+    build_parser.add_argument('--min-weight', type=int, default=1)
+
+    self_play_parser = commands.add_parser('self-play', help='build a book from search self-play')
+    self_play_parser.add_argument('book', help='book file to write')
+    self_play_parser.add_argument('--games', type=int, default=100)
+    self_play_parser.add_argument('--max-plies', type=int, default=16)
+    self_play_parser.add_argument('--depth', type=int, default=2)
+    self_play_parser.add_argument('--seed', type=int, default=0)
+
+    probe_parser = commands.add_parser('probe', help='list the book moves for a position')
+    probe_parser.add_argument('book', help='book file to read')
+    probe_parser.add_argument('--moves', nargs='*', default=[], metavar='MOVE',
+                              help='moves such as e2e4 played from the starting position first')
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        games = (moves for _, moves in read_games(args.games) if moves is not None)
+        count = build_book(games, args.book, args.max_plies, args.min_weight)
+        print(f'{count} book records written to {args.book}')
+    elif args.command == 'self-play':
+        games = self_play_games(args.games, args.max_plies, args.depth, seed=args.seed)
+        count = build_book(games, args.book, args.max_plies)
+        print(f'{count} book records written to {args.book}')
+    else:
+        game = ChessVar()
+        for text in args.moves:
+            try:
+                move = parse_move(text)
+            except ValueError as error:
+                parser.error(str(error))
+            if not game.make_move(*move):
+                parser.error('illegal move: ' + text)
+        with OpeningBook(args.book) as book:
+            for book_move in book.moves_for(game):
+                print(f'{book_move.move[0]}{book_move.move[1]}: played {book_move.weight}, '
+                      f'won {book_move.wins}, lost {book_move.losses}')
+
+
+if __name__ == '__main__':
+    main()
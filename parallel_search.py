@@ -0,0 +1,191 @@
+"""
+Parallel search over a process pool by root-move splitting. The root moves
+are ordered once, dealt out round-robin so every worker gets a share of the
+promising ones, and each worker searches its share of the position with the
+usual iterative deepening search under the same time budget. Under a time
+budget the workers finish different depths, and scores from different depths
+cannot be compared, so the shares are compared at the deepest depth all of
+them finished.
+
+    python parallel_search.py --time-ms 2000 --workers 8
+    python parallel_search.py --depth 4 --scaling 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+from Modified_chess import ChessVar, SQUARE_NAMES
+from bitboard import BACKENDS
+from search import SearchResult, Searcher, MAX_DEPTH, WIN_THRESHOLD
+
+
+def search_share(position, root_moves, depth, time_budget_ms, backend):
+    """
+    Searches a packed position over some of its root moves, run in a worker.
+    Returns the (depth, move, score) of every finished iteration and the nodes searched.
+    """
+    game = BACKENDS[backend].from_bytes(position)
+    searcher = Searcher(game, time_budget_ms=time_budget_ms)
+    result = searcher.iterate(MAX_DEPTH if depth is None else depth, root_moves)
+    return searcher.iterations(), result.nodes
+
+
+def best_at_common_depth(shares):
+    """
+    Returns (move, score, depth) for the best move over the iterations of
+    every share. A share that found a forced win wins outright, the quickest
+    win first. Otherwise the scores are compared at the deepest depth all the
+    shares finished, where a share that stopped early on a forced loss keeps
+    its score at any depth. Shares that finished no iteration are left out,
+    and None is returned when none did.
+    """
+    shares = [iterations for iterations in shares if iterations]
+    if not shares:
+        return None
+
+    wins = [iterations[-1] for iterations in shares if iterations[-1][2] > WIN_THRESHOLD]
+    if wins:
+        depth, move, score = max(wins, key=lambda iteration: iteration[2])
+        return move, score, depth
+
+    reached = [iterations[-1][0] for iterations in shares if abs(iterations[-1][2]) <= WIN_THRESHOLD]
+    depth = min(reached) if reached else max(iterations[-1][0] for iterations in shares)
+
+    best = None
+    for iterations in shares:
+        _, move, score = [iteration for iteration in iterations if iteration[0] <= depth][-1]
+        if best is None or score > best[1]:
+            best = move, score
+    return best[0], best[1], depth
+
+
+def split_root_moves(game, workers):
+    """
+    Returns the root moves of game in search order, dealt round-robin into at
+    most workers lists of (move_from, move_to) pairs
+    """
+    moves = [(SQUARE_NAMES[move_from], SQUARE_NAMES[move_to]) for move_from, move_to in Searcher(game).root_moves()]
+    shares = [moves[worker::workers] for worker in range(workers)]
+    return [share for share in shares if share]
+
+
+class ParallelSearcher:
+    """
+    Keeps a pool of worker processes for searching position after position
+    without paying the process start-up each time
+    """
+
+    def __init__(self, workers=None, backend='board'):
+        """Starts the worker pool"""
+        self._workers = workers or os.cpu_count() or 1
+        self._backend = backend
+        self._pool = Pool(self._workers)
+
+    def search(self, game, depth=None, time_budget_ms=None):
+        """
+        Searches game over the pool and returns a SearchResult with the best
+        move and its score for the player to move, the depth the scores were
+        compared at (see best_at_common_depth), and the nodes searched by all
+        workers together. Takes the same arguments as search.search.
+        """
+        if depth is None and time_budget_ms is None:
+            raise ValueError('search needs a depth, a time budget or both')
+        if depth is not None and depth < 1:
+            raise ValueError(f'search depth must be at least 1, got {depth}')
+
+        start = time.perf_counter()
+        position = game.to_bytes()
+        shares = split_root_moves(game, self._workers)
+        pending = [self._pool.apply_async(search_share, (position, share, depth, time_budget_ms, self._backend))
+                   for share in shares]
+        results = [result.get() for result in pending]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        nodes = sum(share_nodes for _, share_nodes in results)
+
+        best = best_at_common_depth([iterations for iterations, _ in results])
+        if best is None:
+            # Not even the first iteration finished, fall back on the first move in search order
+            move = shares[0][0] if shares else None
+            return SearchResult(move, 0, 0, nodes, elapsed_ms)
+        move, score, best_depth = best
+        return SearchResult(move, score, best_depth, nodes, elapsed_ms)
+
+    def close(self):
+        """Stops the worker pool"""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parallel_search(game, depth=None, time_budget_ms=None, workers=None, backend='board'):
+    """Searches game once over a new pool of workers, see ParallelSearcher.search"""
+    with ParallelSearcher(workers, backend) as searcher:
+        return searcher.search(game, depth, time_budget_ms)
+
+
+def scaling_report(game, depth, worker_counts, backend='board'):
+    """
+    Times a fixed depth search of game with each number of workers and returns
+    one dict per count with the time, the nodes, the speedup over one worker
+    and the efficiency (speedup divided by workers). Pool start-up is left out.
+    """
+    report = []
+    baseline = None
+    for workers in worker_counts:
+        with ParallelSearcher(workers, backend) as searcher:
+            result = searcher.search(game, depth=depth)
+
+        seconds = result.elapsed_ms / 1000
+        if baseline is None:
+            baseline = seconds * workers  # Assume the first count scales perfectly if it is not 1
+        speedup = baseline / seconds
+        report.append({'workers': workers, 'seconds': seconds, 'nodes': result.nodes,
+                       'nodes_per_second': result.nodes / seconds, 'speedup': speedup,
+                       'efficiency': speedup / workers, 'move': result.move, 'score': result.score})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search ChessVar positions over several processes')
+    parser.add_argument('--position', help='position text as written by ChessVar.to_text (default: start)')
+    parser.add_argument('--time-ms', type=float, default=None, help='time budget in milliseconds')
+    parser.add_argument('--depth', type=int, default=None, help='depth limit in plies')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: every core)')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='board')
+    parser.add_argument('--scaling', type=int, nargs='+', metavar='WORKERS',
+                        help='report speedup and efficiency at a fixed --depth for these worker counts')
+    args = parser.parse_args(argv)
+    if args.depth is not None and args.depth < 1:
+        parser.error('--depth must be at least 1')
+
+    try:
+        game = ChessVar.from_text(args.position) if args.position else ChessVar()
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.scaling:
+        if args.depth is None:
+            parser.error('--scaling needs --depth')
+        for row in scaling_report(game, args.depth, args.scaling, args.backend):
+            print(f"{row['workers']:3d} workers: {row['seconds']:.2f}s, {row['nodes']} nodes "
+                  f"({row['nodes_per_second']:,.0f}/s), speedup {row['speedup']:.2f}, "
+                  f"efficiency {row['efficiency']:.0%}")
+        return
+
+    if args.depth is None and args.time_ms is None:
+        parser.error('give --depth, --time-ms or both')
+    result = parallel_search(game, args.depth, args.time_ms, args.workers, args.backend)
+    move = result.move[0] + result.move[1] if result.move else 'none'
+    print(f'best {move} score {result.score} depth {result.depth} '
+          f'nodes {result.nodes} in {result.elapsed_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Perft node counter for ChessVar. Counts the positions reached after exactly
+depth plies, which gives a move generation benchmark and a correctness check
+when comparing backends. Lines end as soon as a capture wins the game.
+
+    python perft.py --depth 4 --divide --backend bitboard
+"""
+
+import argparse
+import time
+
+from Modified_chess import SQUARE_NAMES, parse_move
+from bitboard import BACKENDS
+
+
+def perft(game, depth):
+    """Returns the number of leaf nodes depth plies below the game's position"""
+    if depth == 0:
+        return 1
+    if game._get_game_state != 'UNFINISHED':
+        return 0  # Won games have no moves left
+
+    moves = list(game._generate_moves(game._game_turn))
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game._push(*move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+    return nodes
+
+
+def divide(game, depth):
+    """Returns a list of ((move_from, move_to), leaf count) for every root move"""
+    if depth < 1 or game._get_game_state != 'UNFINISHED':
+        return []
+
+    results = []
+    for move_from, move_to in list(game._generate_moves(game._game_turn)):
+        game._push(move_from, move_to)
+        results.append(((SQUARE_NAMES[move_from], SQUARE_NAMES[move_to]), perft(game, depth - 1)))
+        game.pop()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count move generation leaf nodes for ChessVar')
+    parser.add_argument('--depth', type=int, default=3, help='plies to search (default 3)')
+    parser.add_argument('--divide', action='store_true', help='print the leaf count below each root move')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='board', help='board representation')
+    parser.add_argument('--position', help='position text as written by ChessVar.to_text (default: start)')
+    parser.add_argument('--moves', nargs='*', default=[], metavar='MOVE',
+                        help='moves such as g1f3 played from the position first')
+    args = parser.parse_args(argv)
+
+    backend = BACKENDS[args.backend]
+    try:
+        game = backend.from_text(args.position) if args.position else backend()
+    except ValueError as error:
+        parser.error(str(error))
+
+    for text in args.moves:
+        try:
+            move = parse_move(text)
+        except ValueError as error:
+            parser.error(str(error))
+        if not game.make_move(*move):
+            parser.error('illegal move: ' + text)
+
+    start = time.perf_counter()
+    if args.divide:
+        results = divide(game, args.depth)
+        for (move_from, move_to), count in results:
+            print(f'{move_from}{move_to}: {count}')
+        nodes = sum(count for _, count in results)
+    else:
+        nodes = perft(game, args.depth)
+    elapsed = time.perf_counter() - start
+
+    print(f'Depth {args.depth}: {nodes} nodes in {elapsed:.3f}s '
+          f'({nodes / elapsed if elapsed else 0:,.0f} nodes/s)')
+    return nodes
+
+
+if __name__ == '__main__':
+    main()
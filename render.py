@@ -0,0 +1,106 @@
+"""
+Board rendering for streaming games to spectators. Boards are built as one
+string and written in one call to any writable target, and DeltaRenderer
+sends only the squares changed since the last frame of each game, either as
+ANSI cursor updates or as a compact text diff such as "e2=.. e4=wP".
+"""
+
+import sys
+
+from Modified_chess import SQUARE_NAMES, EMPTY_CELL
+
+# Printed board layout: two header lines, then one line per row, and each
+# square's cell starts 4 characters into its line plus 4 per column
+BOARD_LINES = 12
+FIRST_ROW_LINE = 2
+FIRST_CELL_COLUMN = 4
+CELL_WIDTH = 4
+
+
+def board_cells(game):
+    """Returns the printed cell of every square of game's board, indexed by square"""
+    return [EMPTY_CELL if piece is None else piece.get_icon() for piece in game._chess_board]
+
+
+def changed_squares(previous, current):
+    """Returns (square, cell) for each cell that differs between two frames"""
+    return [(square, cell) for square, (old, cell) in enumerate(zip(previous, current)) if old != cell]
+
+
+def ansi_board(game, top=1, left=1):
+    """Returns ANSI escapes drawing the whole board with its top left corner at terminal (top, left)"""
+    return ''.join(f'\x1b[{top + index};{left}H{line}'
+                   for index, line in enumerate(game.render().split('\n')))
+
+
+def ansi_updates(changes, top=1, left=1):
+    """Returns ANSI escapes redrawing the changed cells of a board drawn at (top, left)"""
+    return ''.join(f'\x1b[{top + FIRST_ROW_LINE + (square >> 3)};'
+                   f'{left + FIRST_CELL_COLUMN + CELL_WIDTH * (square & 7)}H{cell}'
+                   for square, cell in changes)
+
+
+def compact_diff(changes):
+    """Returns the changed cells as text such as 'e2=.. e4=wP'"""
+    return ' '.join(f'{SQUARE_NAMES[square]}={cell}' for square, cell in changes)
+
+
+def render_many(games, file=None, separator='\n'):
+    """
+    Renders the boards of games into one string, separated by separator, and
+    writes it to file in a single call when file is given. Returns the string.
+    """
+    text = separator.join(game.render() for game in games)
+    if file is not None:
+        file.write(text + '\n')
+    return text
+
+
+class DeltaRenderer:
+    """
+    Remembers the last frame sent for each game and renders only what changed
+    since. The first frame of a game is the whole board. In 'ansi' mode frames
+    are cursor updates for a board drawn at (top, left) and leave the cursor
+    below the board; in 'diff' mode later frames are compact diffs, empty when
+    nothing changed.
+    """
+
+    MODES = ('ansi', 'diff')
+
+    def __init__(self, mode='ansi', top=1, left=1):
+        """Initializing the renderer with no frames sent"""
+        if mode not in self.MODES:
+            raise ValueError(f'mode must be one of {self.MODES}, not {mode!r}')
+        self._mode = mode
+        self._top = top
+        self._left = left
+        self._frames = {}  # key -> cells of the last frame sent
+
+    def frame(self, game, key=None):
+        """
+        Returns the next frame for game and remembers it. key tells games
+        apart and defaults to the game object's id.
+        """
+        key = id(game) if key is None else key
+        cells = board_cells(game)
+        previous = self._frames.get(key)
+        self._frames[key] = cells
+
+        if self._mode == 'diff':
+            if previous is None:
+                return game.render()
+            return compact_diff(changed_squares(previous, cells))
+
+        if previous is None:
+            text = ansi_board(game, self._top, self._left)
+        else:
+            text = ansi_updates(changed_squares(previous, cells), self._top, self._left)
+        return text + f'\x1b[{self._top + BOARD_LINES};1H'
+
+    def write(self, game, file=None, key=None):
+        """Writes the next frame for game to file, stdout by default"""
+        (file or sys.stdout).write(self.frame(game, key))
+
+    def forget(self, key):
+        """Drops the remembered frame so the next one is the whole board again"""
+        self._frames.pop(key, None)
@@ -0,0 +1,145 @@
+"""
+Batch replay of recorded games across a process pool. Games are read one line
+at a time, replayed in chunks by worker processes and reported in input order,
+with only a bounded number of chunks in flight at once.
+
+Each input line is either a JSON object such as {"id": 7, "moves": ["g1f3",
+"b8c6"]}, a JSON list of moves, or plain text moves separated by spaces.
+Moves may be written 'g1f3', 'g1-f3' or as ['g1', 'f3'] pairs. A line that
+cannot be read is reported as a game with an illegal_ply of 0.
+
+    python replay.py games.jsonl --workers 8 --chunk-size 500 > results.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+from Modified_chess import parse_move
+from bitboard import BACKENDS
+
+
+def read_games(path):
+    """
+    Generates (game_id, moves) for each game in the file, one line at a time.
+    moves is None for a line that cannot be read, such as broken JSON or an
+    object without a moves list, so one bad line does not stop a batch.
+    """
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            game_id, moves = line_number, None
+            try:
+                if line[0] == '{':
+                    record = json.loads(line)
+                    game_id = record.get('id', line_number)
+                    moves = record['moves']
+                elif line[0] == '[':
+                    moves = json.loads(line)
+                else:
+                    moves = line.split()
+            except (ValueError, KeyError):
+                pass
+            yield game_id, moves if isinstance(moves, list) else None
+
+
+def replay_game(game_id, moves, backend='board'):
+    """
+    Replays moves from the starting position and returns a dict with the final
+    state, the ply of the winning capture, the first illegal move and its ply,
+    the number of plies played and the captured counts. Replay stops at the
+    first illegal move, and moves after the game ends are ignored. Unreadable
+    games, with moves None, are reported with an illegal_ply of 0.
+    """
+    game = BACKENDS[backend]()
+    result = {'id': game_id, 'state': 'UNFINISHED', 'plies': 0, 'win_ply': None,
+              'illegal_ply': None if moves is not None else 0, 'illegal_move': None}
+
+    for ply, move in enumerate(moves or (), 1):
+        try:
+            move_from, move_to = parse_move(move) if isinstance(move, str) else move
+            legal = game.make_move(move_from, move_to)
+        except (ValueError, KeyError, IndexError, TypeError):
+            legal = False  # Unreadable moves count as illegal
+
+        if not legal:
+            result['illegal_ply'] = ply
+            result['illegal_move'] = move
+            break
+
+        result['plies'] = ply
+        if not game.is_game_ongoing():
+            if game.get_game_state() != 'DRAW':
+                result['win_ply'] = ply
+            break
+
+    result['state'] = game.get_game_state()
+    result['captured'] = {color: dict(counts) for color, counts in game._captured_counts.items()}
+    return result
+
+
+def replay_chunk(chunk, backend='board'):
+    """Replays a list of (game_id, moves) in a worker process"""
+    return [replay_game(game_id, moves, backend) for game_id, moves in chunk]
+
+
+def map_chunks(function, items, args=(), workers=None, chunk_size=256, max_pending=None):
+    """
+    Calls function(chunk, *args) on chunks of chunk_size items over a pool of
+    workers and yields each chunk's return value in input order.
+
+    At most max_pending chunks (default twice the worker count) are read and
+    in flight at any time, so memory stays bounded however long items is.
+    """
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield function(chunk, *args)
+        return
+
+    max_pending = max_pending or workers * 2
+    with Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(function, (chunk,) + tuple(args)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+
+def replay_games(games, workers=None, chunk_size=256, max_pending=None, backend='board'):
+    """
+    Replays an iterable of (game_id, moves) over a pool of workers and yields
+    each game's result in input order, see map_chunks
+    """
+    for results in map_chunks(replay_chunk, games, (backend,), workers, chunk_size, max_pending):
+        yield from results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded ChessVar games and report their outcome')
+    parser.add_argument('path', help='JSONL or text file with one game per line')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: every core)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='games sent to a worker at a time')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='board', help='board representation')
+    args = parser.parse_args(argv)
+
+    results = replay_games(read_games(args.path), args.workers, args.chunk_size, backend=args.backend)
+    for result in results:
+        sys.stdout.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
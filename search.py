@@ -0,0 +1,291 @@
+"""
+Alpha-beta search for ChessVar. A side loses as soon as every piece of one
+type (or its queen) has been captured, so the evaluation scores how close
+each side is to running out of a piece type rather than looking for mate.
+"""
+
+import time
+from collections import namedtuple
+
+from Modified_chess import SQUARE_NAMES, SQUARE_INDEX
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+SearchResult = namedtuple('SearchResult', 'move score depth nodes elapsed_ms')
+
+PIECE_VALUES = {'Pawn': 100, 'Knight': 300, 'Bishop': 320, 'Rook': 500, 'Queen': 900, 'King': 900}
+
+# Penalty for having this many pieces of a type left, the fewer there are the
+# closer the side is to losing the game. Queens and kings always sit at one
+# for both sides and cancel out.
+LOSS_PRESSURE = (0, 600, 150, 60, 30, 15, 8, 4, 0)
+
+WIN_SCORE = 1000000
+WIN_THRESHOLD = WIN_SCORE - 1000  # Scores above this are wins found by the search
+INFINITY = WIN_SCORE + 1
+MAX_DEPTH = 64
+MAX_QUIESCENCE_DEPTH = 8
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out"""
+    pass
+
+
+def evaluate(game):
+    """
+    Scores the position from the point of view of the player to move, using
+    the material each side has left and how close it is to losing a piece type
+    """
+    score = 0
+    for color, sign in (('WHITE', 1), ('BLACK', -1)):
+        for piece_type, remaining in game._remaining[color].items():
+            score += sign * (remaining * PIECE_VALUES[piece_type] - LOSS_PRESSURE[remaining])
+
+    return score if game._game_turn == 'WHITE' else -score
+
+
+def search(game, depth=None, time_budget_ms=None, table=None, root_moves=None):
+    """
+    Searches game with iterative deepening negamax and alpha-beta pruning and
+    returns a SearchResult with the best (move_from, move_to) pair and its
+    score for the player to move.
+
+    Stops after depth plies, or when time_budget_ms runs out, whichever comes
+    first. A depth below 1 raises ValueError. Pass a TranspositionTable to
+    reuse results between searches, and root_moves to only consider some of
+    the moves at the root. The game is used for the search and left as it was
+    found, so each concurrent search needs its own game.
+    """
+    if depth is None and time_budget_ms is None:
+        raise ValueError('search needs a depth, a time budget or both')
+    if depth is not None and depth < 1:
+        raise ValueError(f'search depth must be at least 1, got {depth}')
+
+    searcher = Searcher(game, table, time_budget_ms)
+    return searcher.iterate(MAX_DEPTH if depth is None else depth, root_moves)
+
+
+class Searcher:
+    """
+    Holds the state of one search: the game being searched, the transposition
+    table, the deadline and the node count
+    """
+
+    def __init__(self, game, table=None, time_budget_ms=None):
+        """Initializing the search state"""
+        self._game = game
+        self._table = table if table is not None else TranspositionTable(1 << 16)
+        self._time_budget_ms = time_budget_ms
+        self._deadline = None
+        self._nodes = 0
+        self._iterations = []  # (depth, move, score) of every finished iteration
+
+    def iterate(self, max_depth, root_moves=None):
+        """Runs iterative deepening up to max_depth and returns a SearchResult"""
+        game = self._game
+        start = time.perf_counter()
+        if self._time_budget_ms is not None:
+            self._deadline = start + self._time_budget_ms / 1000
+
+        self._table.new_search()
+        self._iterations = []
+        moves = self.root_moves(root_moves)
+        if not moves:
+            return SearchResult(None, 0, 0, 0, 0.0)
+
+        best_move, best_score, completed_depth = moves[0], 0, 0
+        base_ply = game.plies_played()
+        try:
+            for depth in range(1, max_depth + 1):
+                self._root_best = None
+                score = self.search_root(moves, depth)
+                best_move, best_score, completed_depth = self._root_best, score, depth
+                self._iterations.append((depth, best_move, score))
+
+                # Search the best move first next time round
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+
+                if abs(score) > WIN_THRESHOLD:
+                    break  # Forced result found, deeper searches cannot change it
+                if self._deadline is not None:
+                    # The next iteration takes several times longer than this one
+                    spent = time.perf_counter() - start
+                    if start + spent * 3 > self._deadline:
+                        break
+        except SearchTimeout:
+            # Keep the last finished iteration, unless the first one did not finish
+            if completed_depth == 0 and self._root_best is not None:
+                best_move = self._root_best
+        finally:
+            while game.plies_played() > base_ply:
+                game.pop()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        move = SQUARE_NAMES[best_move[0]], SQUARE_NAMES[best_move[1]]
+        return SearchResult(move, best_score, completed_depth, self._nodes, elapsed_ms)
+
+    def iterations(self):
+        """
+        Returns (depth, (move_from, move_to), score) for every iteration the
+        last call to iterate finished, shallowest first
+        """
+        return [(depth, (SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]]), score)
+                for depth, move, score in self._iterations]
+
+    def root_moves(self, root_moves=None):
+        """Returns the ordered root moves as square index pairs"""
+        game = self._game
+        if not game.is_game_ongoing():
+            return []
+
+        moves = list(game._generate_moves(game._game_turn))
+        if root_moves is not None:
+            wanted = {(SQUARE_INDEX[move_from], SQUARE_INDEX[move_to]) for move_from, move_to in root_moves}
+            moves = [move for move in moves if move in wanted]
+        return self.order_moves(moves, None)
+
+    def search_root(self, moves, depth):
+        """Searches every root move to depth and returns the best score"""
+        game = self._game
+        alpha = -INFINITY
+        for move in moves:
+            game._push(*move)
+            score = -self.negamax(depth - 1, -INFINITY, -alpha, 1)
+            game.pop()
+            if score > alpha:
+                alpha = score
+                self._root_best = move
+
+        self._table.store(game._zobrist_key, depth, alpha, EXACT, self._root_best)
+        return alpha
+
+    def negamax(self, depth, alpha, beta, ply):
+        """Returns the score of the position for the player to move"""
+        game = self._game
+        self.count_node()
+
+        if game._get_game_state != 'UNFINISHED':
+            if game._get_game_state == 'DRAW':
+                return 0
+            # The capture that ended the game was made by the opponent
+            return -(WIN_SCORE - ply)
+
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply, 0)
+
+        key = game._zobrist_key
+        entry = self._table.probe(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, table_move = entry
+            if entry_depth >= depth:
+                entry_score = score_from_table(entry_score, ply)
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if entry_flag == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        moves = self.order_moves(list(game._generate_moves(game._game_turn)), table_move)
+        if not moves:
+            return 0  # Nothing can move, treat it as a draw
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        for move in moves:
+            game._push(*move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            game.pop()
+
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._table.store(key, depth, score_to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def quiesce(self, alpha, beta, ply, quiescence_depth):
+        """Searches captures only, so the evaluation is not taken mid-exchange"""
+        game = self._game
+        self.count_node()
+        stand_pat = evaluate(game)
+        if stand_pat >= beta or quiescence_depth >= MAX_QUIESCENCE_DEPTH:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        board = game._chess_board
+        captures = [move for move in game._generate_moves(game._game_turn)
+                    if board[move[1]] is not None]
+        for move in self.order_moves(captures, None):
+            game._push(*move)
+            if game._get_game_state != 'UNFINISHED':
+                score = WIN_SCORE - ply - 1
+            else:
+                score = -self.quiesce(-beta, -alpha, ply + 1, quiescence_depth + 1)
+            game.pop()
+
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+        return alpha
+
+    def order_moves(self, moves, table_move):
+        """
+        Orders moves with the table move first, then captures that win the
+        game, then other captures by most valuable victim and least valuable
+        attacker, then quiet moves
+        """
+        game = self._game
+        board = game._chess_board
+
+        def priority(move):
+            if move == table_move:
+                return 10000000
+            victim = board[move[1]]
+            if victim is None:
+                return 0
+            if game._wins_by_capture(move[1]):
+                return 1000000
+            attacker = board[move[0]]
+            return 1000 + PIECE_VALUES[victim._piece_type] * 10 - PIECE_VALUES[attacker._piece_type] // 10
+
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def count_node(self):
+        """Counts a node and checks the deadline every 256 nodes"""
+        self._nodes += 1
+        if self._deadline is not None and not self._nodes & 255 and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+
+def score_to_table(score, ply):
+    """Stores win scores as distance from this node rather than from the root"""
+    if score > WIN_THRESHOLD:
+        return score + ply
+    if score < -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Turns a stored win score back into distance from the root"""
+    if score > WIN_THRESHOLD:
+        return score - ply
+    if score < -WIN_THRESHOLD:
+        return score + ply
+    return score
@@ -0,0 +1,294 @@
+"""
+asyncio server hosting many ChessVar games at once over newline-delimited
+JSON, on TCP or a Unix socket. Each request is one JSON object per line and
+gets one JSON object back, with any "id" field echoed:
+
+    {"cmd": "create"}                                  -> {"ok": true, "game": "..."}
+    {"cmd": "move", "game": "...", "from": "e2", "to": "e4"}
+    {"cmd": "state", "game": "..."}
+    {"cmd": "board", "game": "..."}
+    {"cmd": "moves", "game": "..."}
+    {"cmd": "close", "game": "..."}
+
+Games unused for idle_seconds are evicted. Backpressure comes from answering
+each connection's requests in order and waiting for the answer to drain
+before reading the next one, from a cap on games and connections, and from
+a limit on request line length.
+
+    python server.py serve --port 8765
+    python server.py loadgen --clients 200 --moves 20000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import OrderedDict
+
+from bitboard import BACKENDS
+
+MAX_LINE_BYTES = 4096
+
+
+class GameServer:
+    """
+    Keeps the registry of live games, least recently used first, and answers
+    requests for them
+    """
+
+    def __init__(self, max_games=100000, idle_seconds=600, max_connections=10000, backend='board'):
+        """Initializing the registry and limits"""
+        self._games = OrderedDict()  # game id -> [game, last used time]
+        self._max_games = max_games
+        self._idle_seconds = idle_seconds
+        self._max_connections = max_connections
+        self._connections = 0
+        self._game_class = BACKENDS[backend]
+
+    def __len__(self):
+        """Returns the number of live games"""
+        return len(self._games)
+
+    def create_game(self, position=None):
+        """Registers a new game and returns its id, or None when the server is full"""
+        if len(self._games) >= self._max_games:
+            self.evict_idle()
+            if len(self._games) >= self._max_games:
+                return None
+
+        game = self._game_class.from_text(position) if position else self._game_class()
+        game_id = secrets.token_hex(8)
+        self._games[game_id] = [game, time.monotonic()]
+        return game_id
+
+    def get_game(self, game_id):
+        """Returns the game for game_id and marks it as used, or None"""
+        session = self._games.get(game_id)
+        if session is None:
+            return None
+        session[1] = time.monotonic()
+        self._games.move_to_end(game_id)
+        return session[0]
+
+    def evict_idle(self, now=None):
+        """Drops games unused for idle_seconds and returns how many went"""
+        cutoff = (now if now is not None else time.monotonic()) - self._idle_seconds
+        evicted = 0
+        while self._games:
+            game_id, (game, last_used) = next(iter(self._games.items()))
+            if last_used > cutoff:
+                break
+            del self._games[game_id]
+            evicted += 1
+        return evicted
+
+    def handle_request(self, line):
+        """Answers one request line with a response dict"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'ok': False, 'error': 'bad request: not JSON'}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'bad request: not a JSON object'}
+
+        try:
+            response = self.dispatch(request)
+        except (ValueError, KeyError, TypeError) as error:
+            response = {'ok': False, 'error': f'bad request: {error!r}'}
+
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    def dispatch(self, request):
+        """Runs the command named by request['cmd']"""
+        command = request.get('cmd')
+        if command == 'create':
+            position = request.get('position')
+            if position is not None and not isinstance(position, str):
+                return {'ok': False, 'error': 'bad request: position must be a string'}
+            game_id = self.create_game(position)
+            if game_id is None:
+                return {'ok': False, 'error': 'server full'}
+            return {'ok': True, 'game': game_id}
+
+        game = self.get_game(request.get('game'))
+        if game is None:
+            return {'ok': False, 'error': 'unknown game'}
+
+        if command == 'move':
+            moved = game.make_move(request['from'], request['to'])
+            return {'ok': moved, 'state': game.get_game_state(), 'turn': game.get_game_turn()}
+        if command == 'state':
+            return {'ok': True, 'state': game.get_game_state(), 'turn': game.get_game_turn(),
+                    'captured': game._captured_counts}
+        if command == 'board':
+            return {'ok': True, 'board': game.to_text(), 'text': game.render()}
+        if command == 'moves':
+            return {'ok': True, 'moves': [move_from + move_to for move_from, move_to in game.legal_moves()]}
+        if command == 'close':
+            del self._games[request['game']]
+            return {'ok': True}
+
+        return {'ok': False, 'error': f'unknown command: {command}'}
+
+    async def handle_connection(self, reader, writer):
+        """Answers requests from one client, one line at a time"""
+        if self._connections >= self._max_connections:
+            writer.write(b'{"ok": false, "error": "too many connections"}\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        self._connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                if not line:
+                    break
+
+                writer.write(json.dumps(self.handle_request(line)).encode() + b'\n')
+                await writer.drain()  # A slow reader holds up only its own connection
+        except ConnectionError:
+            pass
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    async def evict_forever(self):
+        """Evicts idle games a few times per idle period"""
+        while True:
+            await asyncio.sleep(max(self._idle_seconds / 4, 0.1))
+            self.evict_idle()
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Starts listening and the eviction task, returns the asyncio server"""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path, limit=MAX_LINE_BYTES)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_BYTES)
+        self._eviction_task = asyncio.ensure_future(self.evict_forever())
+        return server
+
+
+async def open_client(host, port, unix_path):
+    """Opens a client connection to the server"""
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=1 << 16)
+    return await asyncio.open_connection(host, port, limit=1 << 16)
+
+
+async def load_client(host, port, unix_path, moves_wanted, latencies, seed):
+    """Plays random legal moves in one game after another until moves_wanted are made"""
+    reader, writer = await open_client(host, port, unix_path)
+    rng = random.Random(seed)
+
+    async def call(request):
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    game_id = (await call({'cmd': 'create'}))['game']
+    made = 0
+    while made < moves_wanted:
+        moves = (await call({'cmd': 'moves', 'game': game_id}))['moves']
+        if not moves:
+            game_id = (await call({'cmd': 'create'}))['game']
+            continue
+
+        move = rng.choice(moves)
+        start = time.perf_counter()
+        reply = await call({'cmd': 'move', 'game': game_id, 'from': move[:2], 'to': move[2:]})
+        latencies.append(time.perf_counter() - start)
+        made += 1
+
+        if reply['state'] != 'UNFINISHED':
+            await call({'cmd': 'close', 'game': game_id})
+            game_id = (await call({'cmd': 'create'}))['game']
+
+    writer.close()
+
+
+def percentile(values, fraction):
+    """Returns the value at fraction (0 to 1) of the sorted values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(clients, total_moves, host=None, port=0, unix_path=None, backend='board'):
+    """
+    Runs clients concurrent players making total_moves moves between them and
+    returns a dict with moves/sec and p50/p99 move latency in milliseconds.
+    Starts a local server first unless host or unix_path points at one.
+    """
+    server = None
+    if host is None and unix_path is None:
+        server = await GameServer(backend=backend).start('127.0.0.1', 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    latencies = []
+    start = time.perf_counter()
+    per_client = max(1, total_moves // clients)
+    await asyncio.gather(*(load_client(host, port, unix_path, per_client, latencies, seed)
+                           for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    return {'clients': clients, 'moves': len(latencies), 'seconds': elapsed,
+            'moves_per_second': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000, 'p99_ms': percentile(latencies, 0.99) * 1000}
+
+
+async def serve(args):
+    """Runs the server until interrupted"""
+    game_server = GameServer(args.max_games, args.idle_seconds, args.max_connections, args.backend)
+    server = await game_server.start(args.host, args.port, args.unix)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host ChessVar games over newline-delimited JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='run the game server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    serve_parser.add_argument('--max-games', type=int, default=100000)
+    serve_parser.add_argument('--max-connections', type=int, default=10000)
+    serve_parser.add_argument('--idle-seconds', type=float, default=600)
+    serve_parser.add_argument('--backend', choices=sorted(BACKENDS), default='board')
+
+    load_parser = commands.add_parser('loadgen', help='measure moves/sec and latency')
+    load_parser.add_argument('--clients', type=int, default=100)
+    load_parser.add_argument('--moves', type=int, default=10000, help='moves made across all clients')
+    load_parser.add_argument('--host', help='server to load (default: start a local one)')
+    load_parser.add_argument('--port', type=int, default=8765)
+    load_parser.add_argument('--unix', help='Unix socket of the server to load')
+    load_parser.add_argument('--backend', choices=sorted(BACKENDS), default='board')
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(run_load(args.clients, args.moves, args.host, args.port, args.unix, args.backend))
+        print(f"{report['moves']} moves by {report['clients']} clients in {report['seconds']:.2f}s: "
+              f"{report['moves_per_second']:,.0f} moves/s, p50 {report['p50_ms']:.2f} ms, "
+              f"p99 {report['p99_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Proof-number solver for forced wins. Proves or disproves that the player to
+move can force a winning capture within a number of plies, whatever the
+other side plays, and returns the winning line when it can.
+
+    python solver.py --position "<to_text position>" --plies 5
+"""
+
+import argparse
+import time
+from collections import namedtuple
+
+from Modified_chess import ChessVar, SQUARE_NAMES
+
+SolverResult = namedtuple('SolverResult', 'result line nodes elapsed_ms nodes_per_second')
+
+PROVEN = 'PROVEN'
+DISPROVEN = 'DISPROVEN'
+UNKNOWN = 'UNKNOWN'
+
+INFINITE = 1 << 62
+
+
+class ProofNode:
+    """
+    One position in the proof tree. The attacker (the player to move at the
+    root) picks moves at OR nodes and the defender at AND nodes.
+    """
+
+    __slots__ = ('move', 'parent', 'children', 'proof', 'disproof', 'is_or', 'plies_left')
+
+    def __init__(self, move, parent, is_or, plies_left):
+        """Initializing an unexpanded node"""
+        self.move = move
+        self.parent = parent
+        self.children = None
+        self.proof = 1
+        self.disproof = 1
+        self.is_or = is_or
+        self.plies_left = plies_left
+
+    def update_numbers(self):
+        """Recomputes the proof and disproof numbers from the children"""
+        children = self.children
+        if self.is_or:
+            self.proof = min(child.proof for child in children)
+            self.disproof = min(INFINITE, sum(child.disproof for child in children))
+        else:
+            self.proof = min(INFINITE, sum(child.proof for child in children))
+            self.disproof = min(child.disproof for child in children)
+
+
+class ProofNumberSolver:
+    """
+    Searches the tree below the game's position, always expanding the most
+    proving node, until the root is proven, disproven or the node budget is
+    spent. The game is walked with push/pop and left as it was found.
+    """
+
+    def __init__(self, game, plies, node_budget=1000000):
+        """Initializing the solver for the side to move in game"""
+        self._game = game
+        self._plies = plies
+        self._node_budget = node_budget
+        self._attacker = game.get_game_turn()
+        self._nodes = 0
+
+    def solve(self):
+        """Runs the search and returns a SolverResult"""
+        game = self._game
+        start = time.perf_counter()
+        root = ProofNode(None, None, True, self._plies)
+        self.evaluate(root)
+
+        base_ply = game.plies_played()
+        try:
+            while root.proof and root.disproof and self._nodes < self._node_budget:
+                node = self.select_most_proving(root)
+                self.expand(node)
+                self.update_ancestors(node)
+        finally:
+            while game.plies_played() > base_ply:
+                game.pop()
+
+        elapsed = time.perf_counter() - start
+        if root.proof == 0:
+            result, line = PROVEN, self.winning_line(root)
+        elif root.disproof == 0:
+            result, line = DISPROVEN, []
+        else:
+            result, line = UNKNOWN, []
+
+        return SolverResult(result, line, self._nodes, elapsed * 1000,
+                            self._nodes / elapsed if elapsed else 0.0)
+
+    def evaluate(self, node):
+        """Sets the numbers of the root if the game there is already decided"""
+        state = self._game._get_game_state
+        if state != 'UNFINISHED':
+            won = state == ('WHITE_WON' if self._attacker == 'WHITE' else 'BLACK_WON')
+            node.proof, node.disproof = (0, INFINITE) if won else (INFINITE, 0)
+        elif node.plies_left == 0:
+            node.proof, node.disproof = INFINITE, 0  # Out of plies without a win
+
+    def select_most_proving(self, root):
+        """Walks down to the most proving leaf, playing its moves on the game"""
+        game = self._game
+        node = root
+        while node.children is not None:
+            if node.is_or:
+                node = min(node.children, key=lambda child: child.proof)
+            else:
+                node = min(node.children, key=lambda child: child.disproof)
+            game._push(*node.move)
+        return node
+
+    def expand(self, node):
+        """
+        Creates the children of the leaf the game is at. A move ends the game
+        when it captures the last piece of a type, which is read from the
+        remaining counts without playing the move.
+        """
+        game = self._game
+        if not game.is_game_ongoing():
+            # Only a draw can end the game on the way here, wins are caught when nodes are made
+            self.evaluate(node)
+            node.children = []
+            return
+
+        attacker_moves = node.is_or
+        node.children = []
+
+        for move in game._generate_moves(game._game_turn):
+            self._nodes += 1
+            child = ProofNode(move, node, not node.is_or, node.plies_left - 1)
+            if game._wins_by_capture(move[1]):
+                # The mover wins on the spot
+                child.proof, child.disproof = (0, INFINITE) if attacker_moves else (INFINITE, 0)
+            elif child.plies_left == 0:
+                child.proof, child.disproof = INFINITE, 0  # Out of plies without a win
+            node.children.append(child)
+
+            # One winning move proves an OR node, one refutation disproves an AND node
+            if (attacker_moves and child.proof == 0) or (not attacker_moves and child.disproof == 0):
+                break
+
+        if node.children:
+            node.update_numbers()
+        else:
+            node.proof, node.disproof = INFINITE, 0  # Nothing can move, no win here
+        self.prune(node)
+
+    def update_ancestors(self, node):
+        """Backs the new numbers up to the root, taking moves back on the way"""
+        game = self._game
+        while node.parent is not None:
+            node = node.parent
+            game.pop()
+            node.update_numbers()
+            self.prune(node)
+
+    def prune(self, node):
+        """
+        Frees the subtrees a solved node no longer needs, keeping only what
+        the winning line is read from
+        """
+        if node.disproof == 0:
+            node.children = []
+        elif node.proof == 0 and node.is_or:
+            node.children = [child for child in node.children if child.proof == 0]
+
+    def proof_depth(self, node):
+        """Returns how many plies the proven node needs to force the win"""
+        if not node.children:
+            return 0
+        depths = [self.proof_depth(child) for child in node.children]
+        return 1 + (min(depths) if node.is_or else max(depths))
+
+    def winning_line(self, root):
+        """
+        Returns the proven line as (move_from, move_to) pairs, following the
+        fastest win at OR nodes and the longest defence at AND nodes
+        """
+        line = []
+        node = root
+        while node.children:
+            if node.is_or:
+                node = min(node.children, key=self.proof_depth)
+            else:
+                node = max(node.children, key=self.proof_depth)
+            line.append((SQUARE_NAMES[node.move[0]], SQUARE_NAMES[node.move[1]]))
+        return line
+
+
+def solve(game, plies, node_budget=1000000):
+    """
+    Proves or disproves that the player to move in game wins within plies and
+    returns a SolverResult with PROVEN, DISPROVEN or UNKNOWN (budget spent),
+    the winning line when proven, the nodes searched and nodes per second
+    """
+    return ProofNumberSolver(game, plies, node_budget).solve()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prove forced wins in ChessVar positions')
+    parser.add_argument('--position', help='position text as written by ChessVar.to_text (default: start)')
+    parser.add_argument('--plies', type=int, default=3, help='plies the win must come within')
+    parser.add_argument('--nodes', type=int, default=1000000, help='node budget')
+    args = parser.parse_args(argv)
+
+    try:
+        game = ChessVar.from_text(args.position) if args.position else ChessVar()
+    except ValueError as error:
+        parser.error(str(error))
+
+    result = solve(game, args.plies, args.nodes)
+    print(f'{result.result} in {result.nodes} nodes, {result.elapsed_ms:.1f} ms '
+          f'({result.nodes_per_second:,.0f} nodes/s)')
+    if result.line:
+        print(' '.join(move_from + move_to for move_from, move_to in result.line))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+Regression checks for the paths that have more than one implementation,
+such as the board and bitboard backends, the NumPy batch validation and
+the incrementally kept attack maps, and for results that were once wrong.
+
+    python -m pytest tests
+    python -m unittest tests/test_regression.py
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from Modified_chess import ChessVar, AttackMap, SQUARE_NAMES, SQUARE_INDEX
+from bitboard import BACKENDS, BitboardChessVar, board_bitboards
+from archive import ArchiveReader, ArchiveWriter
+from mcts import MCTS
+from parallel_search import best_at_common_depth
+from perft import perft
+from search import WIN_SCORE, search
+from solver import solve, PROVEN
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Leaf counts from the starting position, depth 1 to 4
+START_PERFT = (20, 400, 8902, 197742)
+
+# Knights out and back, the starting position comes up again every four plies
+KNIGHT_SHUFFLE = (('g1', 'f3'), ('g8', 'f6'), ('f3', 'g1'), ('f6', 'g8'))
+
+
+def random_plies(game, rng, max_plies):
+    """Plays up to max_plies random moves on game with _push, yielding after each"""
+    for _ in range(max_plies):
+        if not game.is_game_ongoing():
+            return
+        game._push(*rng.choice(list(game._generate_moves(game._game_turn))))
+        yield
+
+
+def replay(backend, moves, **draw_rules):
+    """Returns a new game with the (from_square, to_square) index pairs of moves pushed"""
+    game = backend(**draw_rules)
+    for move in moves:
+        game._push(*move)
+    return game
+
+
+def forces_win(game, attacker, plies):
+    """Returns True if attacker wins within plies whatever the other side plays, by brute force"""
+    state = game.get_game_state()
+    if state != 'UNFINISHED':
+        return state == attacker + '_WON'
+    if plies == 0:
+        return False
+
+    moves = list(game._generate_moves(game._game_turn))
+    if not moves:
+        return False
+    attacking = game._game_turn == attacker
+    for move in moves:
+        game._push(*move)
+        won = forces_win(game, attacker, plies - 1)
+        game.pop()
+        if won == attacking:
+            return won
+    return not attacking
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_start_position(self):
+        for name, backend in sorted(BACKENDS.items()):
+            for depth, nodes in enumerate(START_PERFT, 1):
+                with self.subTest(backend=name, depth=depth):
+                    self.assertEqual(perft(backend(), depth), nodes)
+
+
+class BackendTest(unittest.TestCase):
+
+    def test_backends_agree_over_random_games(self):
+        rng = random.Random(9)
+        for _ in range(6):
+            board, bitboard = ChessVar(), BitboardChessVar()
+            for _ in random_plies(board, rng, 80):
+                move = board._move_stack[-1][:2]
+                bitboard._push(*move)
+                for color in ('WHITE', 'BLACK'):
+                    self.assertEqual(sorted(board.legal_moves(color)), sorted(bitboard.legal_moves(color)))
+                for square in SQUARE_NAMES:
+                    self.assertEqual(sorted(board.moves_from(square)), sorted(bitboard.moves_from(square)))
+                for from_square in range(64):
+                    for to_square in range(64):
+                        self.assertEqual(board._is_valid_move(from_square, to_square),
+                                         bitboard._is_valid_move(from_square, to_square),
+                                         (SQUARE_NAMES[from_square], SQUARE_NAMES[to_square]))
+
+            # Taking the moves back must leave the bitboards in step with the board
+            while bitboard._move_stack:
+                bitboard.pop()
+                self.assertEqual((bitboard._bitboards, bitboard._occupancy), board_bitboards(bitboard._chess_board))
+
+
+@unittest.skipIf(numpy is None, 'batch validation needs numpy')
+class BatchValidationTest(unittest.TestCase):
+
+    def test_matches_is_valid_move(self):
+        from batch_validation import stack_games, validate_moves
+
+        rng = random.Random(4)
+        games = []
+        for _ in range(12):
+            game = ChessVar()
+            for _ in random_plies(game, rng, rng.randrange(60)):
+                pass
+            games.append(game)
+
+        boards, sides = stack_games(games)
+        pairs = [(from_square, to_square) for from_square in range(64) for to_square in range(64)]
+        board_index = [index for index in range(len(games)) for _ in pairs]
+        from_squares = [from_square for _ in games for from_square, _ in pairs]
+        to_squares = [to_square for _ in games for _, to_square in pairs]
+        valid = validate_moves(boards, sides, from_squares, to_squares, board_index)
+
+        expected = [games[index]._is_valid_move(from_square, to_square)
+                    for index, from_square, to_square in zip(board_index, from_squares, to_squares)]
+        self.assertEqual(valid.tolist(), expected)
+
+
+class AttackMapTest(unittest.TestCase):
+
+    def assert_matches_rebuilt(self, game):
+        kept, rebuilt = game.attack_map(), AttackMap(game._chess_board)
+        for square in range(64):
+            self.assertEqual(set(kept._attacks[square]), set(rebuilt._attacks[square]), SQUARE_NAMES[square])
+            self.assertEqual(kept.attackers(square), rebuilt.attackers(square), SQUARE_NAMES[square])
+            for color in ('WHITE', 'BLACK'):
+                self.assertEqual(kept.count(square, color), rebuilt.count(square, color), SQUARE_NAMES[square])
+
+    def test_incremental_matches_rebuilt(self):
+        rng = random.Random(7)
+        for backend in (ChessVar, BitboardChessVar):
+            for _ in range(5):
+                game = backend()
+                game.attack_map()
+                for _ in random_plies(game, rng, 120):
+                    self.assert_matches_rebuilt(game)
+                while game._move_stack:
+                    game.pop()
+                    self.assert_matches_rebuilt(game)
+
+
+class MaterialTest(unittest.TestCase):
+
+    def test_closest_loss_counts_types_with_several_pieces(self):
+        game = ChessVar()
+        self.assertEqual(game.closest_loss('WHITE'), 2)
+        for move_from, move_to in (('g1', 'f3'), ('b8', 'c6'), ('f3', 'e5'), ('c6', 'e5')):
+            game.make_move(move_from, move_to)
+        self.assertEqual((game.closest_loss('WHITE'), game.closest_loss('BLACK')), (1, 2))
+        game.pop()
+        self.assertEqual(game.closest_loss('WHITE'), 2)
+
+
+class ForkTest(unittest.TestCase):
+
+    def assert_matches_replay(self, game, moves, draw_rules):
+        replayed = replay(type(game), moves, **draw_rules)
+        self.assertEqual(game.to_bytes(), replayed.to_bytes())
+        self.assertEqual(game.get_zobrist_key(), replayed.get_zobrist_key())
+        self.assertEqual(game.repetitions(), replayed.repetitions())
+        self.assertEqual(game.plies_since_capture(), replayed.plies_since_capture())
+        self.assertEqual(game.plies_played(), len(moves))
+
+    def test_fork_tree_matches_replay(self):
+        # Random pushes, pops and forks over a tree of games, knights shuffling often to make repetitions
+        rng = random.Random(5)
+        for backend in (ChessVar, BitboardChessVar):
+            for draw_rules in ({}, {'repetition_limit': None, 'no_capture_limit': None}):
+                games = [(backend(**draw_rules), [])]
+                for _ in range(300):
+                    game, moves = rng.choice(games)
+                    roll = rng.random()
+                    if roll < 0.1 and len(games) < 20:
+                        games.append((game.fork(), list(moves)))
+                    elif roll < 0.3 and moves:
+                        game.pop()
+                        moves.pop()
+                    elif game.is_game_ongoing():
+                        candidates = list(game._generate_moves(game._game_turn))
+                        knights = [move for move in candidates if game._chess_board[move[1]] is None and
+                                   game._chess_board[move[0]]._piece_type == 'Knight']
+                        move = rng.choice(knights if knights and rng.random() < 0.6 else candidates)
+                        game._push(*move)
+                        moves.append(move)
+                    self.assert_matches_replay(game, moves, draw_rules)
+
+                # Every game can take back its moves from before the forks it came from
+                for game, moves in games:
+                    while moves:
+                        game.pop()
+                        moves.pop()
+                        self.assert_matches_replay(game, moves, draw_rules)
+                    with self.assertRaises(IndexError):
+                        game.pop()
+
+    def test_pop_across_fork_point_leaves_parent(self):
+        game = ChessVar()
+        for move_from, move_to in KNIGHT_SHUFFLE:
+            game.make_move(move_from, move_to)
+        child = game.fork()
+        child.make_move('e2', 'e4')
+        for _ in range(5):
+            child.pop()
+        self.assertEqual(child.to_bytes(), ChessVar().to_bytes())
+        self.assertEqual(child.repetitions(), 1)
+        self.assertEqual(game.plies_played(), 4)
+        self.assertEqual(game.repetitions(), 2)
+
+
+class DrawTest(unittest.TestCase):
+
+    def test_repetition_draw(self):
+        game = ChessVar()
+        for move_from, move_to in KNIGHT_SHUFFLE * 2:
+            self.assertEqual(game.get_game_state(), 'UNFINISHED')
+            game.make_move(move_from, move_to)
+        self.assertEqual((game.get_game_state(), game.repetitions()), ('DRAW', 3))
+        self.assertFalse(game.make_move('e2', 'e4'))
+        game.pop()
+        self.assertEqual(game.get_game_state(), 'UNFINISHED')
+
+    def test_no_capture_draw(self):
+        game = ChessVar(no_capture_limit=4)
+        for move_from, move_to in KNIGHT_SHUFFLE:
+            game.make_move(move_from, move_to)
+        self.assertEqual((game.get_game_state(), game.plies_since_capture()), ('DRAW', 4))
+
+    def test_rules_turned_off(self):
+        game = ChessVar(repetition_limit=None, no_capture_limit=None)
+        for move_from, move_to in KNIGHT_SHUFFLE * 30:
+            game.make_move(move_from, move_to)
+        self.assertEqual(game.get_game_state(), 'UNFINISHED')
+
+    def test_pop_after_set_game_turn(self):
+        # The key changed after the move was counted, pop must uncount the key it counted
+        game = ChessVar()
+        game.make_move('e2', 'e4')
+        game.set_game_turn('WHITE')
+        game.pop()
+        self.assertEqual(game.to_bytes(), ChessVar().to_bytes())
+        self.assertEqual(game.repetitions(), 1)
+        game.make_move('e2', 'e4')
+        self.assertEqual(game.repetitions(), 1)
+
+    def test_solver_does_not_prove_through_a_draw(self):
+        # Qg6 then Qxe8 wins in three plies, but with a no-capture limit of 1 the quiet Qg6 draws
+        game = ChessVar.from_text('rnbqkbn1/2ppp1pr/1p3p1p/8/PpP3P1/7B/2QPPP1P/RNB1K1NR w P *')
+        self.assertEqual(solve(game, 3).result, PROVEN)
+        game._no_capture_limit = 1
+        self.assertNotEqual(solve(game, 3).result, PROVEN)
+        self.assertFalse(forces_win(game, 'WHITE', 3))
+
+    def test_solver_matches_brute_force_under_draw_rules(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            game = ChessVar(no_capture_limit=None)
+            for _ in range(rng.randrange(10, 60)):
+                moves = list(game._generate_moves(game._game_turn))
+                if not game.is_game_ongoing() or not moves:
+                    break
+                game._push(*rng.choice(moves))
+            if not game.is_game_ongoing():
+                continue
+            # Tight no-capture limits from here, so quiet moves on the way draw
+            game._no_capture_limit = rng.choice((1, 2, 3))
+            game._plies_since_capture = 0
+
+            result = solve(game, 3)
+            self.assertEqual(result.result == PROVEN, forces_win(game, game.get_game_turn(), 3))
+
+    def test_archive_keeps_draw_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games')
+            with ArchiveWriter(path, 3) as writer:
+                writer.append([move_from + move_to for move_from, move_to in KNIGHT_SHUFFLE * 2])
+            with ArchiveReader(path) as reader:
+                self.assertEqual(reader.state(0), 'DRAW')
+                self.assertEqual(reader.position(0, 8).get_game_state(), 'DRAW')
+                game = reader.position(0, 7)
+                self.assertEqual(game.repetitions(), 2)
+                game.make_move('f6', 'g8')
+                self.assertEqual(game.get_game_state(), 'DRAW')
+
+
+class PositionFormatTest(unittest.TestCase):
+
+    def test_round_trips(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            game = ChessVar()
+            while game.is_game_ongoing():
+                text, packed = game.to_text(), game.to_bytes()
+                from_text, from_bytes = ChessVar.from_text(text), ChessVar.from_bytes(packed)
+                # Captured pieces are written in one order whatever order they were taken in
+                self.assertEqual(from_bytes.to_text(), text)
+                self.assertEqual(from_text.to_bytes(), packed)
+                self.assertEqual(from_text.get_zobrist_key(), game.get_zobrist_key())
+                self.assertEqual(from_bytes.get_zobrist_key(), game.get_zobrist_key())
+                game.make_move(*rng.choice(list(game.legal_moves())))
+
+
+class SearchTest(unittest.TestCase):
+
+    def test_depth_below_one_is_rejected(self):
+        for depth in (0, -1):
+            with self.assertRaises(ValueError):
+                search(ChessVar(), depth)
+            with self.assertRaises(ValueError):
+                search(ChessVar(), depth, time_budget_ms=10)
+
+    def test_time_budget_without_depth(self):
+        result = search(ChessVar(), time_budget_ms=50)
+        self.assertIsNotNone(result.move)
+        self.assertGreaterEqual(result.depth, 1)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_forced_win_beats_shallower_scores(self):
+        # One worker stopped early on a win while the other ran out of time
+        shares = [[(1, 'a', 10), (2, 'a', 20), (3, 'a', WIN_SCORE - 3)], [(1, 'b', 30), (2, 'b', 40)]]
+        self.assertEqual(best_at_common_depth(shares), ('a', WIN_SCORE - 3, 3))
+
+    def test_quickest_win_is_taken(self):
+        shares = [[(1, 'a', 0), (2, 'a', WIN_SCORE - 5)], [(1, 'b', WIN_SCORE - 1)], [(1, 'c', 50), (2, 'c', 60)]]
+        self.assertEqual(best_at_common_depth(shares), ('b', WIN_SCORE - 1, 1))
+
+    def test_scores_compared_at_common_depth(self):
+        shares = [[(1, 'a', 10), (2, 'a', 20), (3, 'a', 90)], [(1, 'b', 30), (2, 'b', 40)], []]
+        self.assertEqual(best_at_common_depth(shares), ('b', 40, 2))
+
+
+class MCTSTest(unittest.TestCase):
+
+    def test_drawing_move_is_not_decisive(self):
+        game = ChessVar(repetition_limit=2)
+        for move_from, move_to in (('g1', 'f3'), ('g8', 'f6'), ('f3', 'g1')):
+            game.make_move(move_from, move_to)
+
+        tree = MCTS(game, seed=1)
+        result = tree.search(playouts=300)
+        drawing = [child for child in tree._root.children if child.move == (SQUARE_INDEX['f6'], SQUARE_INDEX['g8'])]
+        self.assertEqual(len(drawing), 1)
+        self.assertFalse(drawing[0].decisive)
+        self.assertNotEqual(result.move, ('f6', 'g8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Fixed-size transposition table keyed by ChessVar Zobrist keys, so results
+computed for one position can be reused when it is reached again through a
+different move order.
+"""
+
+# Kinds of stored scores
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+    """
+    Holds at most max_entries results, one slot per key % max_entries.
+
+    When two positions want the same slot the stored one is kept only if it
+    came from the current search generation and was searched deeper than the
+    new result. Call new_search before each search so results from earlier
+    searches age out.
+    """
+
+    def __init__(self, max_entries=1 << 18):
+        """Allocates every slot up front so memory use never grows"""
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+
+        self._max_entries = max_entries
+        self._slots = [None] * max_entries  # (key, depth, score, flag, move, generation)
+        self._generation = 0
+        self._used = 0
+        self._probes = 0
+        self._hits = 0
+
+    def __len__(self):
+        """Returns how many slots are filled"""
+        return self._used
+
+    def get_max_entries(self):
+        """Returns the number of slots in the table"""
+        return self._max_entries
+
+    def new_search(self):
+        """Starts a new search generation, making older entries replaceable"""
+        self._generation += 1
+
+    def clear(self):
+        """Empties every slot and resets the statistics"""
+        self._slots = [None] * self._max_entries
+        self._used = 0
+        self._probes = 0
+        self._hits = 0
+
+    def probe(self, key):
+        """
+        Returns the stored (depth, score, flag, move) for key, or None when the
+        position is not in the table
+        """
+        self._probes += 1
+        entry = self._slots[key % self._max_entries]
+        if entry is not None and entry[0] == key:
+            self._hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, key, depth, score, flag, move=None):
+        """
+        Stores a search result for key unless its slot holds a deeper result
+        for another position from the current generation
+        """
+        index = key % self._max_entries
+        entry = self._slots[index]
+        if entry is None:
+            self._used += 1
+        elif entry[0] != key and entry[5] == self._generation and entry[1] > depth:
+            return
+        self._slots[index] = (key, depth, score, flag, move, self._generation)
+
+    def stats(self):
+        """Returns a dict with the table size, filled slots, probes and hits"""
+        return {'max_entries': self._max_entries, 'used': self._used,
+                'probes': self._probes, 'hits': self._hits}